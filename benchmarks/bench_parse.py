@@ -0,0 +1,63 @@
+"""Micro-benchmark: app-root-state extraction, full DOM parse vs fast path
+
+Compares parse time and peak traced memory of the BeautifulSoup + full
+json.loads path against app_state.extract_state_section on the saved
+fixtures in benchmarks/fixtures/.
+
+    python -m benchmarks.bench_parse [--runs 30]
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+from weather_llm_demo import app_state
+from .fixtures import DASHBOARD_FIXTURE, FORECAST_FIXTURE, build_dashboard_html, build_forecast_html, load_fixture
+
+CASES = (
+    ("dashboard", DASHBOARD_FIXTURE, build_dashboard_html, "observations"),
+    ("forecast", FORECAST_FIXTURE, build_forecast_html, "daypart"),
+)
+
+PATHS: Dict[str, Callable[[bytes, str], dict]] = {
+    "dom": app_state.extract_state_section_dom,
+    "fast": app_state.extract_state_section,
+}
+
+
+def measure(fn: Callable[[bytes, str], dict], html: bytes, key: str, runs: int) -> Tuple[float, float, int]:
+    """Return median ms, min ms and peak traced bytes for one extraction path"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(html, key)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn(html, key)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), min(timings), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"JSON decoder for full-state fallback: {'orjson' if app_state.orjson else 'json'}")
+    print(f"{'fixture':<10} {'size KB':>8} {'path':<5} {'median ms':>10} {'min ms':>8} {'peak MB':>8}")
+    for name, path, build, key in CASES:
+        html = load_fixture(path) if path.exists() else build().encode("utf-8")
+        baseline = None
+        for label, fn in PATHS.items():
+            median, fastest, peak = measure(fn, html, key, args.runs)
+            speedup = f"  x{baseline / median:.1f}" if baseline else ""
+            baseline = baseline or median
+            print(f"{name:<10} {len(html) // 1024:>8} {label:<5} {median:>10.2f} {fastest:>8.2f} {peak / 2**20:>8.2f}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
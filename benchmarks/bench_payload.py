@@ -0,0 +1,141 @@
+"""Tool payload benchmark: full JSON versus compact tool results for the LLM
+
+Both parts run against the local stand-ins:
+
+- payload: each tool's result built from the fixtures, as the full JSON sent
+  before and in the compact form; characters, estimated tokens and render
+  time (first render and memoized)
+- chat:    /api/chat through the tool flow with TOOL_PAYLOAD_FORMAT=json and
+  =compact; prompt tokens of the second completion and end-to-end latency,
+  with the OpenRouter stand-in adding prefill latency per prompt token
+
+    python -m benchmarks.bench_payload [--requests 40] [--prefill-ms-per-1k 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from .fixtures import BASE_EPOCH, STATION_ID
+from .load_test import CHAT_MESSAGE, AppProcess, app_env
+from .stand_ins import StandInServer, create_openrouter_app, create_wu_app
+
+
+def per_call_us(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def tool_results() -> Dict[str, Any]:
+    """One result per tool, from the fixtures served by the WU stand-in"""
+    from weather_llm_demo.observation_store import ObservationStore
+    from weather_llm_demo.weather_agent import WeatherAgent, WeatherCache
+
+    # No retention, so the fixture's old observations are kept for the history tool
+    store = ObservationStore("", retention_days=0)
+    agent = WeatherAgent(station_id=STATION_ID, location="Rome, Italy", cache=WeatherCache(), store=store)
+    try:
+        current = await agent.get_current_conditions()
+        return {
+            "get_current_weather": current,
+            "get_weather_forecast": await agent.get_forecast(),
+            "get_all_weather": await agent.get_all_weather_data(),
+            "get_forecast_days": await agent.get_forecast_range(5, 2),
+            "get_weather_history": await agent.get_history(start=BASE_EPOCH - 3600, end=BASE_EPOCH + 86400),
+        }
+    finally:
+        await agent.aclose()
+
+
+def run_payload(results: Dict[str, Any], repeat: int) -> None:
+    from weather_llm_demo.sessions import estimate_tokens
+    from weather_llm_demo.tool_payload import RenderMemo, render_tool_result
+    import weather_llm_demo.tool_payload as tool_payload
+
+    def tokens(content: str) -> int:
+        return estimate_tokens({"role": "tool", "content": content})
+
+    print(f"{'tool':<22} {'json chars':>10} {'tokens':>7} {'compact':>8} {'tokens':>7} {'saved':>6}"
+          f"   {'json us':>8} {'render us':>9} {'memo us':>8}")
+    for name, result in results.items():
+        full = render_tool_result(name, result, "json")
+        compact = render_tool_result(name, result, "compact")
+        json_us = per_call_us(lambda: json.dumps(result), repeat)
+
+        def first_render() -> None:
+            # A fresh memo each time, so every call renders
+            tool_payload.memo = RenderMemo()
+            render_tool_result(name, result, "compact")
+
+        render_us = per_call_us(first_render, repeat)
+        tool_payload.memo = RenderMemo()
+        memo_us = per_call_us(lambda: render_tool_result(name, result, "compact"), repeat)
+        print(f"{name:<22} {len(full):>10} {tokens(full):>7} {len(compact):>8} {tokens(compact):>7} "
+              f"{1 - len(compact) / len(full):>6.0%}   {json_us:>8.1f} {render_us:>9.1f} {memo_us:>8.2f}")
+
+
+async def measure_chat(env: Dict[str, str], openrouter_app: Any, requests: int) -> Dict[str, float]:
+    """Sequential tool-flow chats; latency and prompt tokens of the second completion"""
+    app = AppProcess(env)
+    try:
+        await app.wait_ready()
+        latencies: List[float] = []
+        async with httpx.AsyncClient(base_url=app.url, timeout=60) as client:
+            # One warm-up request fills the weather cache
+            (await client.post("/api/chat", json={"message": CHAT_MESSAGE})).raise_for_status()
+            openrouter_app.state.prompt_tokens.clear()
+            for _ in range(requests):
+                start = time.perf_counter()
+                (await client.post("/api/chat", json={"message": CHAT_MESSAGE})).raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        app.stop()
+    # Two completions per chat: the tool request, then the answer with the results
+    second = openrouter_app.state.prompt_tokens[1::2]
+    return {
+        "p50_ms": statistics.median(latencies),
+        "mean_ms": statistics.mean(latencies),
+        "prompt_tokens": statistics.median(second),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    wu = StandInServer(create_wu_app(args.latency_ms / 1000)).start()
+    openrouter_app = create_openrouter_app(args.latency_ms / 1000, args.prefill_ms_per_1k / 1000 / 1000)
+    openrouter = StandInServer(openrouter_app).start()
+    # Weather stays cached; completions are not, so every chat reaches the stand-in
+    env = {**app_env(wu.url, openrouter.url, warm_cache=True, fast_path=False), "COMPLETION_CACHE_SIZE": "0"}
+    os.environ.update(env)
+    try:
+        run_payload(await tool_results(), args.repeat)
+        print()
+        print(f"chat, tool flow: {args.requests} requests, stand-in latency {args.latency_ms:g} ms "
+              f"+ {args.prefill_ms_per_1k:g} ms per 1k prompt tokens")
+        for payload_format in ("json", "compact"):
+            result = await measure_chat({**env, "TOOL_PAYLOAD_FORMAT": payload_format}, openrouter_app, args.requests)
+            print(f"{payload_format:<8} second-call prompt tokens {result['prompt_tokens']:>6.0f}   "
+                  f"p50 {result['p50_ms']:>7.1f} ms   mean {result['mean_ms']:>7.1f} ms")
+    finally:
+        wu.stop()
+        openrouter.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=2000, help="Render repetitions per tool")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added latency per stand-in response")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=100.0, help="Stand-in latency per 1000 prompt tokens")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Cold start benchmark: import time, time to ready and time to the first weather answer
+
+Each run starts a fresh process:
+
+- import: `import weather_llm_demo.main` alone, and the modules it left unloaded
+- ready:  uvicorn launched until /api/health answers
+- first:  launch until the first /api/weather/all answer, which pays the
+          scrape unless STARTUP_PREWARM warmed the cache before serving
+
+The app runs against the local Weather Underground stand-in.
+
+    python -m benchmarks.bench_startup [--runs 5] [--latency-ms 300]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from .load_test import AppProcess, app_env
+from .stand_ins import StandInServer, create_openrouter_app, create_wu_app
+
+# Heavy modules that should not be loaded just by importing the app
+LAZY_MODULES = ("numpy", "bs4", "lxml")
+
+IMPORT_PROBE = (
+    "import sys, time, json; start = time.perf_counter(); import weather_llm_demo.main; "
+    "print(json.dumps({'seconds': time.perf_counter() - start, "
+    f"'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))"
+)
+
+
+def measure_import(env: Dict[str, str]) -> Dict[str, object]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], env={**os.environ, **env}, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+async def measure_start(env: Dict[str, str]) -> Dict[str, float]:
+    """Seconds from launch to ready, and to the first weather answer"""
+    start = time.perf_counter()
+    app = AppProcess(env)
+    try:
+        await app.wait_ready(timeout=60)
+        ready = time.perf_counter() - start
+        async with httpx.AsyncClient(base_url=app.url, timeout=60) as client:
+            (await client.get("/api/weather/all")).raise_for_status()
+        first = time.perf_counter() - start
+    finally:
+        app.stop()
+    return {"ready": ready, "first": first}
+
+
+def summarize(values: List[float]) -> str:
+    return f"median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms"
+
+
+async def run(args: argparse.Namespace) -> None:
+    wu = StandInServer(create_wu_app(args.latency_ms / 1000)).start()
+    openrouter = StandInServer(create_openrouter_app()).start()
+    # Warm caches on, so STARTUP_PREWARM has something to fill
+    env = app_env(wu.url, openrouter.url, warm_cache=True, fast_path=False)
+    os.environ.update(env)
+    try:
+        imports = [measure_import(env) for _ in range(args.runs)]
+        print(f"import     {summarize([r['seconds'] for r in imports])}   heavy modules loaded: {imports[0]['loaded'] or 'none'}")
+        for prewarm in (False, True):
+            results = [await measure_start({**env, "STARTUP_PREWARM": str(prewarm).lower()}) for _ in range(args.runs)]
+            label = "prewarm" if prewarm else "cold"
+            print(f"{label:<7} ready  {summarize([r['ready'] for r in results])}")
+            print(f"{label:<7} first  {summarize([r['first'] for r in results])}   (ready to first answer "
+                  f"{statistics.median(r['first'] - r['ready'] for r in results) * 1000:.1f} ms)")
+    finally:
+        wu.stop()
+        openrouter.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Added latency per stand-in response")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
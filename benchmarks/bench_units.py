@@ -0,0 +1,65 @@
+"""Micro-benchmark: unit conversion and derived metrics, vectorized vs scalar
+
+Converts the observation series of the saved dashboard fixture (and larger
+multiples of it, as for many stations or many days) with
+units.convert_observations and with the per-observation reference
+units.convert_observations_scalar, checking that both agree.
+
+    python -m benchmarks.bench_units [--runs 30]
+"""
+
+import argparse
+import math
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from weather_llm_demo.app_state import extract_state_section
+from weather_llm_demo.units import convert_observations, convert_observations_scalar
+from .fixtures import DASHBOARD_FIXTURE, build_dashboard_html, load_fixture
+
+SCALES = (1, 10, 100)
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], Any], observations: List[Dict[str, Any]], runs: int) -> float:
+    """Return the median ms of one conversion path"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(observations)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def max_difference(observations: List[Dict[str, Any]]) -> float:
+    """Largest absolute difference between the two paths over every column"""
+    vectorized = convert_observations(observations)
+    scalar = convert_observations_scalar(observations)
+    worst = 0.0
+    for name, column in vectorized.items():
+        for value, row in zip(column.tolist(), scalar):
+            if math.isnan(value) != math.isnan(row[name]):
+                return math.inf
+            if not math.isnan(value):
+                worst = max(worst, abs(value - row[name]))
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    html = load_fixture(DASHBOARD_FIXTURE) if DASHBOARD_FIXTURE.exists() else build_dashboard_html().encode("utf-8")
+    observations = extract_state_section(html, "observations")["observations"]
+    print(f"max difference vectorized vs scalar: {max_difference(observations):.2e}")
+    print(f"{'observations':>12} {'scalar ms':>10} {'numpy ms':>9} {'speedup':>8}")
+    for scale in SCALES:
+        series = observations * scale
+        scalar = measure(convert_observations_scalar, series, args.runs)
+        vectorized = measure(convert_observations, series, args.runs)
+        print(f"{len(series):>12} {scalar:>10.3f} {vectorized:>9.3f} {scalar / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Saved Weather Underground HTML fixtures for benchmarks
+
+The fixtures in benchmarks/fixtures/ are gzip-compressed pages. They can be
+regenerated synthetically (deterministic, shaped like the real payloads) or
+recorded from the live site:
+
+    python -m benchmarks.fixtures              # synthesize
+    python -m benchmarks.fixtures --record     # download real pages (needs STATION_ID)
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+DASHBOARD_FIXTURE = FIXTURES_DIR / "dashboard.html.gz"
+FORECAST_FIXTURE = FIXTURES_DIR / "forecast.html.gz"
+
+STATION_ID = "IROME8278"
+# 2024-07-15 00:00:00 UTC
+BASE_EPOCH = 1721001600
+
+
+def _observation(rng: random.Random, i: int) -> Dict[str, Any]:
+    epoch = BASE_EPOCH + i * 300
+    hour = (i * 5 / 60) % 24
+    temp = 77 + 12 * math.sin((hour - 9) / 24 * 2 * math.pi) + rng.uniform(-0.5, 0.5)
+    wind = max(0.0, 6 + rng.uniform(-3, 5))
+    return {
+        "stationID": STATION_ID,
+        "tz": "Europe/Rome",
+        "obsTimeUtc": f"2024-07-15T{int(hour):02d}:{int(hour * 60) % 60:02d}:00Z",
+        "obsTimeLocal": f"2024-07-15 {int(hour):02d}:{int(hour * 60) % 60:02d}:00",
+        "epoch": epoch,
+        "lat": 41.89,
+        "lon": 12.49,
+        "solarRadiationHigh": round(max(0.0, 800 * math.sin((hour - 6) / 14 * math.pi)), 1),
+        "uvHigh": round(max(0.0, 9 * math.sin((hour - 6) / 14 * math.pi)), 1),
+        "winddirAvg": rng.randint(0, 359),
+        "humidityHigh": 70,
+        "humidityLow": 40,
+        "humidityAvg": round(55 - 10 * math.sin((hour - 9) / 24 * 2 * math.pi)),
+        "qcStatus": 1,
+        "imperial": {
+            "tempHigh": round(temp + 0.4, 1),
+            "tempLow": round(temp - 0.4, 1),
+            "tempAvg": round(temp, 1),
+            "windspeedHigh": round(wind + 2, 1),
+            "windspeedLow": round(max(0.0, wind - 2), 1),
+            "windspeedAvg": round(wind, 1),
+            "windgustHigh": round(wind + 6, 1),
+            "windgustLow": round(wind + 1, 1),
+            "windgustAvg": round(wind + 3, 1),
+            "dewptHigh": 62.0,
+            "dewptLow": 58.0,
+            "dewptAvg": 60.0,
+            "windchillHigh": round(temp + 0.4, 1),
+            "windchillLow": round(temp - 0.4, 1),
+            "windchillAvg": round(temp, 1),
+            "heatindexHigh": round(temp + 1.5, 1),
+            "heatindexLow": round(temp + 0.5, 1),
+            "heatindexAvg": round(temp + 1.0, 1),
+            "pressureMax": 29.95,
+            "pressureMin": 29.92,
+            "pressureTrend": 0.01,
+            "precipRate": 0.0,
+            "precipTotal": 0.0,
+        },
+    }
+
+
+def _forecast(rng: random.Random, days: int) -> Dict[str, Any]:
+    names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    highs = [rng.randint(82, 95) for _ in range(days)]
+    lows = [h - rng.randint(14, 20) for h in highs]
+    slots = days * 2
+
+    def per_slot(fn) -> List[Any]:
+        return [fn(i) for i in range(slots)]
+
+    daypart = {
+        "cloudCover": per_slot(lambda i: rng.randint(0, 100)),
+        "dayOrNight": per_slot(lambda i: "D" if i % 2 == 0 else "N"),
+        "daypartName": per_slot(lambda i: f"{names[(i // 2) % 7]}{'' if i % 2 == 0 else ' night'}"),
+        "iconCode": per_slot(lambda i: rng.choice([30, 32, 34, 11, 29])),
+        "narrative": per_slot(lambda i: "Partly cloudy. Highs in the low 30s and lows in the upper teens."),
+        "precipChance": per_slot(lambda i: rng.choice([0, 5, 10, 20, 40, 60])),
+        "precipType": per_slot(lambda i: "rain"),
+        "qpf": per_slot(lambda i: rng.choice([0.0, 0.0, 0.02, 0.1])),
+        "relativeHumidity": per_slot(lambda i: rng.randint(35, 85)),
+        "temperature": per_slot(lambda i: highs[i // 2] if i % 2 == 0 else lows[i // 2]),
+        "temperatureHeatIndex": per_slot(lambda i: highs[i // 2] + 2),
+        "temperatureWindChill": per_slot(lambda i: lows[i // 2]),
+        "thunderCategory": per_slot(lambda i: None),
+        "uvIndex": per_slot(lambda i: rng.randint(0, 9) if i % 2 == 0 else 0),
+        "windDirection": per_slot(lambda i: rng.randint(0, 359)),
+        "windDirectionCardinal": per_slot(lambda i: rng.choice(["N", "SW", "W", "NE"])),
+        "windPhrase": per_slot(lambda i: "Winds W at 10 to 15 km/h."),
+        "windSpeed": per_slot(lambda i: rng.randint(3, 15)),
+        "wxPhraseLong": per_slot(lambda i: rng.choice(["Sunny", "Partly Cloudy", "Showers"])),
+        "wxPhraseShort": per_slot(lambda i: rng.choice(["Sunny", "P Cloudy", "Showers"])),
+    }
+    # The current day's daytime slot is null once it has passed
+    for values in daypart.values():
+        values[0] = None
+    return {
+        "calendarDayTemperatureMax": highs,
+        "calendarDayTemperatureMin": lows,
+        "dayOfWeek": [names[i % 7] for i in range(days)],
+        "narrative": ["Partly cloudy. Highs 28 to 32C and lows 17 to 19C."] * days,
+        "qpf": [rng.choice([0.0, 0.05, 0.2]) for _ in range(days)],
+        "qpfSnow": [0.0] * days,
+        "sunriseTimeLocal": [f"2024-07-{15 + i:02d}T05:50:00+0200" for i in range(days)],
+        "sunsetTimeLocal": [f"2024-07-{15 + i:02d}T20:45:00+0200" for i in range(days)],
+        "temperatureMax": highs,
+        "temperatureMin": lows,
+        "validTimeLocal": [f"2024-07-{15 + i:02d}T07:00:00+0200" for i in range(days)],
+        "validTimeUtc": [BASE_EPOCH + 18000 + i * 86400 for i in range(days)],
+        "daypart": [daypart],
+    }
+
+
+def _filler_entries(rng: random.Random, count: int) -> Dict[str, Any]:
+    """Unrelated app state entries (i18n strings, location lookups, ads config)"""
+    entries = {}
+    for n in range(count):
+        entries[str(rng.randint(10**9, 10**10))] = {
+            "b": {
+                "items": [
+                    {"key": f"label_{n}_{i}", "value": "x" * rng.randint(5, 40), "flags": [1, 2, 3]}
+                    for i in range(40)
+                ],
+                "\"nested\"": {"b": 1, "text": "contains \"b\": and </scr\\u0069pt> like text"},
+            },
+            "s": 200,
+            "u": f"https://api.weather.com/v3/unrelated/{n}?format=json",
+        }
+    return entries
+
+
+def _page(state: Dict[str, Any], rng: random.Random) -> str:
+    markup = "".join(
+        f'<div class="module-{i}"><span class="wu-value">{rng.random():.4f}</span>'
+        f'<a href="/path/{i}">link {i}</a></div>\n'
+        for i in range(2500)
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Weather Underground</title>"
+        "<script>window.dataLayer = [];</script></head><body><app-root>"
+        f"{markup}</app-root>"
+        f'<script id="app-root-state" type="application/json">{json.dumps(state, separators=(",", ":"))}</script>'
+        "</body></html>"
+    )
+
+
+def build_dashboard_html(observations: int = 288, seed: int = 7) -> str:
+    """Build a dashboard page with a full day of 5-minute observations"""
+    rng = random.Random(seed)
+    state = _filler_entries(rng, 30)
+    state["3063491543"] = {
+        "b": {"observations": [_observation(rng, i) for i in range(observations)]},
+        "s": 200,
+        "u": f"https://api.weather.com/v2/pws/observations/all/1day?stationId={STATION_ID}",
+    }
+    state.update(_filler_entries(rng, 10))
+    return _page(state, rng)
+
+
+def build_forecast_html(days: int = 15, seed: int = 11) -> str:
+    """Build a forecast page with a multi-day daily forecast"""
+    rng = random.Random(seed)
+    state = _filler_entries(rng, 30)
+    state["2184760322"] = {
+        "b": _forecast(rng, days),
+        "s": 200,
+        "u": "https://api.weather.com/v3/wx/forecast/daily/15day?geocode=41.89,12.49",
+    }
+    state.update(_filler_entries(rng, 10))
+    return _page(state, rng)
+
+
+def load_fixture(path: Path) -> bytes:
+    """Return the raw HTML bytes of a saved fixture"""
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+
+def save_fixture(path: Path, html: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.GzipFile(path, "wb", mtime=0) as f:
+        f.write(html)
+
+
+def record() -> None:
+    """Download the live dashboard and forecast pages for STATION_ID"""
+    import httpx
+    from weather_llm_demo.weather_agent import WeatherAgent
+
+    agent = WeatherAgent()
+    with httpx.Client(headers=agent.headers, follow_redirects=True, timeout=30) as client:
+        for url, path in ((agent.station_url, DASHBOARD_FIXTURE), (agent.forecast_url, FORECAST_FIXTURE)):
+            response = client.get(url)
+            response.raise_for_status()
+            save_fixture(path, response.content)
+            print(f"📥 {url} -> {path} ({len(response.content) // 1024} KB)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="record the live pages instead of synthesizing")
+    args = parser.parse_args()
+
+    if args.record:
+        os.environ.setdefault("STATION_ID", STATION_ID)
+        record()
+        return
+    for path, html in ((DASHBOARD_FIXTURE, build_dashboard_html()), (FORECAST_FIXTURE, build_forecast_html())):
+        save_fixture(path, html.encode("utf-8"))
+        print(f"🧪 {path} ({len(html) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
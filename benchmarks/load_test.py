@@ -0,0 +1,293 @@
+"""Offline load test: the app against local Weather Underground and OpenRouter stand-ins
+
+Starts the stand-in servers from benchmarks.stand_ins, launches the app with
+uvicorn in a subprocess pointed at them through WU_BASE_URL and
+OPENROUTER_BASE_URL, then drives each target at a fixed concurrency:
+
+- parse:   app_state extraction on the saved fixtures (in-process, sequential)
+- scrape:  WeatherAgent fetch + parse against the WU stand-in (in-process)
+- weather: GET /api/weather/all
+- chat:    POST /api/chat (two LLM calls plus the weather tool)
+- stream:  POST /api/chat/stream, read to the end
+
+Caches are disabled so every request does the full work; --warm-cache keeps
+the configured caches. Reports p50/p95/p99 latency, throughput and RSS.
+
+    python -m benchmarks.load_test [--requests 200] [--concurrency 16] [--latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .fixtures import DASHBOARD_FIXTURE, FORECAST_FIXTURE, STATION_ID, build_dashboard_html, build_forecast_html, load_fixture
+from .stand_ins import StandInServer, create_openrouter_app, create_wu_app, free_port
+
+TARGETS = ("parse", "scrape", "weather", "chat", "stream")
+CHAT_MESSAGE = "Devo prendere l'ombrello oggi?"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def rss_kb(pid: Optional[int] = None) -> Dict[str, int]:
+    """Current and peak resident set size of a process, in KB"""
+    try:
+        status = Path(f"/proc/{pid or 'self'}/status").read_text()
+    except OSError:
+        # Not Linux: only the peak of this process is available
+        return {"rss_kb": 0, "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return {
+        "rss_kb": int(fields.get("VmRSS", "0 kB").split()[0]),
+        "peak_rss_kb": int(fields.get("VmHWM", "0 kB").split()[0]),
+    }
+
+
+async def drive(call: Callable[[], Awaitable[None]], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Run call() requests times with at most concurrency in flight"""
+    latencies: List[float] = []
+    errors: List[str] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await call()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed, concurrency)
+
+
+def summarize(latencies: List[float], errors: List[str], elapsed: float, concurrency: int) -> Dict[str, Any]:
+    latencies.sort()
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies) if latencies else float("nan"),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_parse(requests: int) -> Dict[str, Any]:
+    """Sequential extraction on both fixtures; CPU-bound, so concurrency is 1"""
+    from weather_llm_demo.app_state import extract_state_section
+
+    pages = [
+        (load_fixture(DASHBOARD_FIXTURE) if DASHBOARD_FIXTURE.exists() else build_dashboard_html().encode(), "observations"),
+        (load_fixture(FORECAST_FIXTURE) if FORECAST_FIXTURE.exists() else build_forecast_html().encode(), "daypart"),
+    ]
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for i in range(requests):
+        html, key = pages[i % len(pages)]
+        begin = time.perf_counter()
+        extract_state_section(html, key)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return summarize(latencies, [], time.perf_counter() - start, 1)
+
+
+async def run_scrape(requests: int, concurrency: int, warm: bool = False) -> Dict[str, Any]:
+    """Fetch and parse both pages from the WU stand-in, bypassing the cache
+
+    Unless warm, the agent also forgets its ETags and content hashes so every
+    fetch is decoded and derived in full.
+    """
+    from weather_llm_demo.weather_agent import WeatherAgent
+
+    agent = WeatherAgent(station_id=STATION_ID, location="Rome, Italy")
+    calls = [agent._fetch_current_conditions, agent._fetch_forecast]
+    counter = iter(range(sys.maxsize))
+
+    async def call() -> None:
+        if not warm:
+            agent._pages.clear()
+        await calls[next(counter) % len(calls)]()
+
+    try:
+        return await drive(call, requests, concurrency)
+    finally:
+        await agent.aclose()
+
+
+async def run_http(base_url: str, target: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Drive one app endpoint over HTTP"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+
+        async def call() -> None:
+            if target == "weather":
+                response = await client.get("/api/weather/all")
+            elif target == "chat":
+                response = await client.post("/api/chat", json={"message": CHAT_MESSAGE})
+            else:
+                async with client.stream("POST", "/api/chat/stream", json={"message": CHAT_MESSAGE}) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+            response.raise_for_status()
+
+        return await drive(call, requests, concurrency)
+
+
+class AppProcess:
+    """The app under uvicorn in a subprocess, configured for the stand-ins"""
+
+    def __init__(self, env: Dict[str, str]):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        # The API key is read from the working directory; any value enables real calls
+        self._workdir = tempfile.TemporaryDirectory()
+        Path(self._workdir.name, ".openrouter_api_key").write_text("load-test")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "weather_llm_demo.main:app",
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning", "--no-access-log"],
+            cwd=self._workdir.name,
+            env={**os.environ, **env},
+        )
+
+    async def wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(base_url=self.url) as client:
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"App exited with code {self.process.returncode}")
+                try:
+                    if (await client.get("/api/health")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("App did not become ready")
+                await asyncio.sleep(0.1)
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._workdir.cleanup()
+
+
+def app_env(wu_url: str, openrouter_url: str, warm_cache: bool, fast_path: bool) -> Dict[str, str]:
+    env = {
+        "WU_BASE_URL": wu_url,
+        "OPENROUTER_BASE_URL": openrouter_url,
+        "FORECAST_URL_TEMPLATE": wu_url + "/weather/it/rome/{station_id}",
+        "STATION_ID": STATION_ID,
+        "WEATHER_POLL_INTERVAL": "0",
+        "CHAT_FAST_PATH": "true" if fast_path else "false",
+        "TIMING_LOG_LEVEL": "WARNING",
+        # Observations stay in memory instead of an observations.db in the working directory
+        "OBSERVATION_STORE_PATH": "",
+        # Every request comes from one client; admission control stays on
+        "RATE_LIMIT_PER_MINUTE": "0",
+    }
+    if not warm_cache:
+        env.update(
+            {
+                "WEATHER_CURRENT_TTL": "0",
+                "WEATHER_FORECAST_TTL": "0",
+                "WEATHER_STALE_TTL": "0",
+                "COMPLETION_CACHE_SIZE": "0",
+            }
+        )
+    return env
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    latency = args.latency_ms / 1000
+    wu = StandInServer(create_wu_app(latency)).start()
+    openrouter = StandInServer(create_openrouter_app(latency)).start()
+    env = app_env(wu.url, openrouter.url, args.warm_cache, args.fast_path)
+    # In-process targets read the same settings at import time
+    os.environ.update(env)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    app: Optional[AppProcess] = None
+    try:
+        for target in args.targets:
+            if target == "parse":
+                results[target] = {**run_parse(args.requests), **rss_kb()}
+            elif target == "scrape":
+                results[target] = {**await run_scrape(args.requests, args.concurrency, args.warm_cache), **rss_kb()}
+            else:
+                if app is None:
+                    app = AppProcess(env)
+                    await app.wait_ready()
+                result = await run_http(app.url, target, args.requests, args.concurrency)
+                results[target] = {**result, **rss_kb(app.process.pid)}
+    finally:
+        if app is not None:
+            app.stop()
+        wu.stop()
+        openrouter.stop()
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, Any]], args: argparse.Namespace) -> None:
+    print(
+        f"upstream latency {args.latency_ms:g} ms, caches {'warm' if args.warm_cache else 'disabled'}, "
+        f"fast path {'on' if args.fast_path else 'off'}"
+    )
+    print(
+        f"{'target':<8} {'reqs':>5} {'errs':>4} {'conc':>4} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'req/s':>8} {'RSS MB':>7} {'peak MB':>7}"
+    )
+    for target, r in results.items():
+        print(
+            f"{target:<8} {r['requests']:>5} {r['errors']:>4} {r['concurrency']:>4} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['throughput_rps']:>8.1f} "
+            f"{r['rss_kb'] / 1024:>7.1f} {r['peak_rss_kb'] / 1024:>7.1f}"
+        )
+        if r["first_error"]:
+            print(f"         first error: {r['first_error']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added latency per stand-in response")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the weather and completion caches enabled")
+    parser.add_argument("--fast-path", action="store_true", help="Enable CHAT_FAST_PATH in the app")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_report(results, args)
+    if args.json:
+        Path(args.json).write_text(json.dumps({"settings": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Local stand-ins for the upstream services, for offline load tests
+
+- Weather Underground: serves the saved dashboard and forecast fixtures, with
+  an ETag and Last-Modified, answering 304 to matching conditional requests.
+- OpenRouter: an OpenAI-compatible /chat/completions mock that asks for the
+  get_all_weather tool on the first turn and answers once tool results are in,
+  with or without streaming. It reports estimated prompt tokens in usage and
+  can add prefill latency per prompt token.
+
+- Redis: a minimal RESP server (PING, GET, SET NX/PX/EX, DEL) for the
+  shared cache's redis backend, so multi-worker runs need no real Redis.
+
+The HTTP stand-ins add a configurable latency per response. Each server runs
+in a background thread so the harness keeps its own event loop.
+
+    python -m benchmarks.stand_ins [--latency-ms 50] [--redis-port 6390]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import socket
+import threading
+import time
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from weather_llm_demo.sessions import CHARS_PER_TOKEN, estimate_tokens
+
+from .fixtures import DASHBOARD_FIXTURE, FORECAST_FIXTURE, build_dashboard_html, build_forecast_html, load_fixture
+
+ANSWER = (
+    "Oggi a Roma il cielo è sereno con temperature gradevoli. "
+    "Non serve l'ombrello, ma porta gli occhiali da sole."
+)
+
+
+def _fixture(path, build) -> bytes:
+    return load_fixture(path) if path.exists() else build().encode("utf-8")
+
+
+def create_wu_app(latency: float = 0.0, conditional: bool = True) -> FastAPI:
+    """Weather Underground stand-in serving the saved HTML fixtures"""
+    app = FastAPI()
+    dashboard = _fixture(DASHBOARD_FIXTURE, build_dashboard_html)
+    forecast = _fixture(FORECAST_FIXTURE, build_forecast_html)
+    last_modified = formatdate(time.time(), usegmt=True)
+    # Page fetches served, to check how often the app actually scrapes
+    app.state.fetches = 0
+    app.state.not_modified = 0
+
+    def page(request: Request, body: bytes) -> Response:
+        if not conditional:
+            return Response(body, media_type="text/html; charset=utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            app.state.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
+    @app.get("/dashboard/pws/{station_id}")
+    async def dashboard_page(station_id: str, request: Request):
+        app.state.fetches += 1
+        await asyncio.sleep(latency)
+        return page(request, dashboard)
+
+    @app.get("/weather/{path:path}")
+    async def forecast_page(path: str, request: Request):
+        app.state.fetches += 1
+        await asyncio.sleep(latency)
+        return page(request, forecast)
+
+    return app
+
+
+def _reply(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Ask for weather on the first tool-enabled turn, answer otherwise"""
+    has_results = any(message.get("role") == "tool" for message in messages)
+    if tools and not has_results:
+        return {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [
+                {
+                    "id": f"call_{time.monotonic_ns()}",
+                    "type": "function",
+                    "function": {"name": "get_all_weather", "arguments": "{}"},
+                }
+            ],
+        }
+    return {"role": "assistant", "content": ANSWER}
+
+
+def _stream_chunks(message: Dict[str, Any]):
+    """Yield the message as OpenAI-style SSE deltas"""
+    if message.get("tool_calls"):
+        deltas = [{"tool_calls": [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]}]
+    else:
+        words = message["content"].split(" ")
+        deltas = [{"content": word + (" " if i < len(words) - 1 else "")} for i, word in enumerate(words)]
+    for delta in deltas:
+        yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def prompt_tokens(body: Dict[str, Any]) -> int:
+    """Estimated prompt tokens of a completion request, as the app's session budget counts them"""
+    tokens = sum(estimate_tokens(message) for message in body.get("messages", []))
+    if body.get("tools"):
+        tokens += len(json.dumps(body["tools"])) // CHARS_PER_TOKEN
+    return tokens
+
+
+def create_openrouter_app(latency: float = 0.0, prefill_per_token: float = 0.0) -> FastAPI:
+    """OpenRouter-compatible chat completions mock
+
+    prefill_per_token adds latency in proportion to the prompt size, like a
+    real model's time to first token.
+    """
+    app = FastAPI()
+    # Estimated prompt tokens of each request, in arrival order
+    app.state.prompt_tokens = []
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        tokens = prompt_tokens(body)
+        app.state.prompt_tokens.append(tokens)
+        await asyncio.sleep(latency + tokens * prefill_per_token)
+        message = _reply(body.get("messages", []), body.get("tools"))
+        if body.get("stream"):
+            return StreamingResponse(_stream_chunks(message), media_type="text/event-stream")
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        return JSONResponse(
+            {
+                "id": "stand-in",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": tokens, "completion_tokens": 0, "total_tokens": tokens},
+            }
+        )
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StandInServer:
+    """Run an ASGI app with uvicorn in a daemon thread"""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.port = port or free_port()
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StandInServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stand-in server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class RedisStandIn:
+    """Minimal in-memory RESP server with the commands the shared cache uses"""
+
+    def __init__(self, port: Optional[int] = None):
+        self.port = port or free_port()
+        # key -> (value, expiry on the monotonic clock or None)
+        self._data: Dict[bytes, tuple] = {}
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._serve, "127.0.0.1", self.port)
+        )
+        self._started.set()
+        self._loop.run_forever()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        value, expires = self._data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+            if b"NX" in options and self._get(key) is not None:
+                return b"$-1\r\n"
+            expires = None
+            for unit, scale in ((b"PX", 1000.0), (b"EX", 1.0)):
+                if unit in options:
+                    expires = time.monotonic() + float(options[options.index(unit) + 1]) / scale
+            self._data[key] = (value, expires)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(self._data.pop(key, None) is not None for key in args[1:])
+            return b":%d\r\n" % removed
+        if command in (b"CLIENT", b"SELECT"):
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self) -> "RedisStandIn":
+        self._thread.start()
+        if not self._started.wait(10):
+            raise RuntimeError(f"Redis stand-in on port {self.port} did not start")
+        return self
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--wu-port", type=int, default=8101)
+    parser.add_argument("--openrouter-port", type=int, default=8102)
+    parser.add_argument("--redis-port", type=int, default=0, help="Also serve a Redis stand-in (0 disables)")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    wu = StandInServer(create_wu_app(latency), args.wu_port).start()
+    openrouter = StandInServer(create_openrouter_app(latency), args.openrouter_port).start()
+    print(f"WU_BASE_URL={wu.url}")
+    print(f"OPENROUTER_BASE_URL={openrouter.url}")
+    redis = RedisStandIn(args.redis_port).start() if args.redis_port else None
+    if redis is not None:
+        print(f"SHARED_CACHE_REDIS_URL={redis.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        wu.stop()
+        openrouter.stop()
+        if redis is not None:
+            redis.stop()
+
+
+if __name__ == "__main__":
+    main()
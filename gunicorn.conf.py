@@ -0,0 +1,22 @@
+"""Multi-worker deployment: gunicorn managing uvicorn workers
+
+    uv run --extra multiworker gunicorn weather_llm_demo.main:app -c gunicorn.conf.py
+
+Workers share weather snapshots through the shared cache (the file backend
+unless SHARED_CACHE_BACKEND says otherwise), so only one worker scrapes a
+station per refresh. Rate limits, admission control and /metrics are per worker.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Streaming chat answers can take a while; keep workers from being killed mid-stream
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Read by the workers when they import the app
+os.environ.setdefault("SHARED_CACHE_BACKEND", "file" if workers > 1 else "memory")
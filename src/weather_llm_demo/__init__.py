@@ -0,0 +1,6 @@
+"""Weather LLM Demo"""
+
+from dotenv import load_dotenv
+
+# Load .env once, before any submodule reads its settings from the environment
+load_dotenv()
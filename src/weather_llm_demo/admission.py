@@ -0,0 +1,170 @@
+"""Per-client rate limiting and admission control for the chat endpoints"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .metrics import ADMISSION_REJECTIONS
+
+# Token bucket per client: sustained requests per minute and burst size (0 disables)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# Separate bucket per client for /api/chat/batch, counted in prompts, so
+# batches neither drain nor bypass the chat bucket
+RATE_LIMIT_BATCH_ITEMS_PER_MINUTE = float(os.getenv("RATE_LIMIT_BATCH_ITEMS_PER_MINUTE", "120"))
+RATE_LIMIT_BATCH_BURST = int(os.getenv("RATE_LIMIT_BATCH_BURST", "500"))
+# Use the first X-Forwarded-For address as the client id (only behind a trusted proxy)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+# Buckets kept in memory; the least recently seen clients are forgotten first
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+# Chat requests allowed to run at once (each makes up to two LLM calls),
+# how many more may wait for a slot, and for how long
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+
+
+class Rejected(Exception):
+    """Request shed by the rate limiter or admission control"""
+
+    def __init__(self, reason: str, status_code: int, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class TokenBucketLimiter:
+    """One token bucket per client id, refilled continuously"""
+
+    def __init__(
+        self,
+        per_minute: float = RATE_LIMIT_PER_MINUTE,
+        burst: int = RATE_LIMIT_BURST,
+        max_clients: int = RATE_LIMIT_MAX_CLIENTS,
+    ):
+        self.rate = per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        # client id -> (tokens, last refill time)
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, client_id: str, cost: float = 1.0) -> None:
+        """Take cost tokens (at most a full bucket) for the client or raise Rejected with a 429"""
+        if not self.enabled:
+            return
+        cost = min(cost, float(self.burst))
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self._buckets[client_id] = (tokens, now)
+            self.rejected += 1
+            ADMISSION_REJECTIONS.inc(reason="rate_limited")
+            raise Rejected("Rate limit exceeded", 429, (cost - tokens) / self.rate)
+
+        self._buckets[client_id] = (tokens - cost, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        self.allowed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "per_minute": self.rate * 60,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionController:
+    """Global cap on in-flight work with a bounded, time-limited wait queue"""
+
+    def __init__(
+        self,
+        max_in_flight: int = CHAT_MAX_IN_FLIGHT,
+        max_queue: int = CHAT_MAX_QUEUE,
+        queue_timeout: float = CHAT_QUEUE_TIMEOUT,
+    ):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        # Smoothed seconds a slot is held, used to suggest Retry-After
+        self.avg_service_time = 1.0
+
+    def _retry_after(self) -> float:
+        return self.avg_service_time * (self.waiting + 1) / self.max_in_flight
+
+    async def acquire(self) -> None:
+        """Wait for a slot, or raise Rejected with a 503 when the queue is full or too slow"""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                ADMISSION_REJECTIONS.inc(reason="queue_full")
+                raise Rejected("Server busy, queue full", 503, self._retry_after())
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                ADMISSION_REJECTIONS.inc(reason="queue_timeout")
+                raise Rejected("Server busy, timed out waiting for a slot", 503, self._retry_after())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self, held_for: Optional[float] = None) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+        if held_for is not None:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * held_for
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_service_seconds": round(self.avg_service_time, 3),
+        }
@@ -0,0 +1,141 @@
+"""Fast extraction of the app-root-state JSON embedded in Weather Underground pages
+
+The pages are several hundred KB of markup with a single
+<script id="app-root-state"> holding the API responses the page was rendered
+from. Instead of building a DOM and decoding the whole blob, the script is
+located by byte offsets and only the "b" object holding the requested key is
+decoded. The full BeautifulSoup parse is kept as a fallback.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_SCRIPT_ID = b'id="app-root-state"'
+_SCRIPT_END = b"</script>"
+_SECTION_KEY = '"b":'
+# How many enclosing "b" candidates to try per key occurrence before giving up
+_MAX_CANDIDATES = 4
+
+# raw_decode stops at the end of the first value, so a sub-object can be decoded
+# in place without knowing where it ends. orjson has no equivalent and is only
+# used when the whole state has to be decoded.
+_decoder = json.JSONDecoder()
+
+
+def loads(data: bytes) -> Any:
+    """Decode JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def find_state_script(html: bytes) -> Optional[bytes]:
+    """Return the app-root-state script body by scanning for byte offsets"""
+    idx = html.find(_SCRIPT_ID)
+    if idx < 0:
+        return None
+    start = html.find(b">", idx) + 1
+    if start == 0:
+        return None
+    end = html.find(_SCRIPT_END, start)
+    if end < 0:
+        return None
+    return html[start:end]
+
+
+def _find_state_script_dom(html: bytes) -> Optional[bytes]:
+    """Locate the script with a full DOM parse (slow path)"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    script = soup.find("script", {"id": "app-root-state"})
+    if not script:
+        return None
+    return script.get_text().encode("utf-8")
+
+
+def _section_from_text(state: str, key: str) -> Optional[Dict[str, Any]]:
+    """Decode only the "b" object that directly holds a non-empty key"""
+    marker = f'"{key}":'
+    pos = state.find(marker)
+    while pos >= 0:
+        section_pos = state.rfind(_SECTION_KEY, 0, pos)
+        for _ in range(_MAX_CANDIDATES):
+            if section_pos < 0:
+                break
+            start = section_pos + len(_SECTION_KEY)
+            while state.startswith((" ", "\n"), start):
+                start += 1
+            if state.startswith("{", start):
+                try:
+                    section, _ = _decoder.raw_decode(state, start)
+                except ValueError:
+                    section = None
+                if isinstance(section, dict) and section.get(key):
+                    return section
+            section_pos = state.rfind(_SECTION_KEY, 0, section_pos)
+        pos = state.find(marker, pos + len(marker))
+    return None
+
+
+def _section_from_state(data: Any, key: str) -> Optional[Dict[str, Any]]:
+    """Scan a fully decoded state for the "b" object holding a non-empty key"""
+    if not isinstance(data, dict):
+        return None
+    for entry in data.values():
+        if isinstance(entry, dict) and isinstance(entry.get("b"), dict) and entry["b"].get(key):
+            return entry["b"]
+    return None
+
+
+def locate_state_script(html: bytes) -> bytes:
+    """Return the app-root-state script body, falling back to a DOM parse
+
+    Raises ValueError if the script tag is missing or empty.
+    """
+    with timed("html_parse"):
+        script = find_state_script(html)
+        if script is None:
+            script = _find_state_script_dom(html)
+    if script is None:
+        raise ValueError("Could not find app-root-state script tag")
+    if not script.strip():
+        raise ValueError("Script tag is empty")
+    return script
+
+
+def extract_state_section(html: bytes, key: str) -> Dict[str, Any]:
+    """Return the app-root-state "b" object that holds key
+
+    Raises ValueError if the script tag or the key cannot be found.
+    """
+    return section_from_script(locate_state_script(html), key)
+
+
+def section_from_script(script: bytes, key: str) -> Dict[str, Any]:
+    """Return the "b" object holding key from an already located script body"""
+    with timed("json_extract", key=key):
+        section = _section_from_text(script.decode("utf-8", errors="replace"), key)
+        if section is None:
+            section = _section_from_state(loads(script), key)
+    if section is None:
+        raise ValueError(f"Could not find {key} data in JSON")
+    return section
+
+
+def extract_state_section_dom(html: bytes, key: str) -> Dict[str, Any]:
+    """Reference implementation: full DOM parse and full JSON decode"""
+    script = _find_state_script_dom(html)
+    if not script:
+        raise ValueError("Could not find app-root-state script tag")
+    section = _section_from_state(json.loads(script), key)
+    if section is None:
+        raise ValueError(f"Could not find {key} data in JSON")
+    return section
@@ -0,0 +1,89 @@
+"""Command-line client for /api/chat/batch
+
+Reads prompts from a file (or stdin), one per line: either plain text or a
+JSON object with "message" and optional "station" and "id". Results are
+written as NDJSON as the server finishes them, followed by a summary line.
+
+    python -m weather_llm_demo.batch_cli prompts.jsonl --station IROME8278 --output advisories.ndjson
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict, List, Optional, TextIO
+
+import httpx
+
+
+def read_items(lines: TextIO, station: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parse prompt lines into batch items; blank lines are skipped"""
+    items = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line) if line.startswith("{") else {"message": line}
+        if station and not item.get("station"):
+            item["station"] = station
+        item.setdefault("id", str(number))
+        items.append(item)
+    return items
+
+
+async def run_batch(
+    url: str, items: List[Dict[str, Any]], output: TextIO, concurrency: Optional[int] = None, timeout: float = 600.0
+) -> Dict[str, Any]:
+    """Post the batch and copy result lines to output as they arrive; return the summary"""
+    payload: Dict[str, Any] = {"items": items}
+    if concurrency:
+        payload["concurrency"] = concurrency
+    summary: Dict[str, Any] = {}
+    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=10.0)) as client:
+        async with client.stream("POST", url.rstrip("/") + "/api/chat/batch", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise SystemExit(f"Batch rejected: HTTP {response.status_code} {response.text}")
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                output.write(line + "\n")
+                output.flush()
+                record = json.loads(line)
+                if record.get("done"):
+                    summary = record
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prompts", nargs="?", default="-", help="Prompt file, one per line ('-' for stdin)")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the app")
+    parser.add_argument("--station", help="Station for prompts that do not name one")
+    parser.add_argument("--concurrency", type=int, help="Completions at once (capped by the server)")
+    parser.add_argument("--output", "-o", default="-", help="NDJSON output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    if args.prompts == "-":
+        items = read_items(sys.stdin, args.station)
+    else:
+        with open(args.prompts, encoding="utf-8") as f:
+            items = read_items(f, args.station)
+    if not items:
+        raise SystemExit("No prompts given")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = asyncio.run(run_batch(args.url, items, output, args.concurrency))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(
+        f"{summary.get('items', 0)} prompts, {summary.get('errors', 0)} errors, "
+        f"{summary.get('stations', 0)} stations in {summary.get('elapsed_ms', 0) / 1000:.1f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
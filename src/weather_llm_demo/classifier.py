@@ -0,0 +1,82 @@
+"""Cheap local classifier deciding whether a chat message needs weather data
+
+    python -m weather_llm_demo.classifier   # check the example tables
+"""
+
+import re
+
+# Whole words, with their inflections spelled out, in the languages the demo
+# advertises (en, it, fr, es, de, pt). They map to the cases the system prompt
+# sends to the get_all_weather tool: weather and forecasts, clothing, outdoor
+# activities, travel and comfort. A word only matches on its own, so "hot"
+# does not match "hotel" nor "wind" "windows".
+WEATHER_WORDS = [
+    # English
+    "weather", "forecasts?", "rain(?:s|y|ing|ed|fall)?", "umbrellas?", "wear(?:ing)?", "jackets?",
+    "coats?", "temperatures?", "hot(?:ter|test)?", "cold(?:er|est)?", "warm(?:er|est)?", "sunny",
+    "sunscreen", "wind(?:s|y)?", "humid(?:ity)?", "snow(?:s|y|ing|ed)?", "storm(?:s|y)?", "outside",
+    "outdoors?", "run(?:s|ning)?", "jog(?:s|ging)?", "bikes?", "biking", "cycl(?:e|es|ing)",
+    "hik(?:e|es|ing)", "picnics?", "beach(?:es)?", "barbecues?", "bbq", "gardens?", "gardening",
+    "laundry", "commut(?:e|es|ing)", "walk(?:s|ing)?",
+    # Italian
+    "meteo", "tempo", "pioggia", "piov(?:e|ere|erà|uto|iggina)", "ombrell(?:o|i)", "indoss(?:are|o)",
+    "vestir(?:e|mi|si)", "vestit(?:o|i)", "giacc(?:a|he)", "cald(?:o|a|i|e)", "fredd(?:o|a|i|e)",
+    "vent(?:o|oso|osa)", "sole", "soleggiato", "neve", "nevic(?:a|herà)", "temporal(?:e|i)",
+    "umid(?:o|a|ità)", "fuori", "aperto", "corsa", "bici(?:cletta)?", "passeggi(?:o|ata|are)",
+    "spiaggia", "mare", "bucato", "giardin(?:o|i|aggio)",
+    # French
+    "météo", "temps", "pluie", "pleut", "pleuvoir", "pleuvra", "parapluie", "porter", "chaude?",
+    "froide?", "vent(?:eux)?", "soleil", "neige", "orages?", "vélo", "plage", "dehors",
+    "promen(?:er|ade)", "courir",
+    # Spanish
+    "tiempo", "clima", "lluvia", "llueve", "lloverá", "paraguas", "ropa", "calor", "fr[ií]a?",
+    "viento", "nieve", "tormentas?", "playa", "bicicleta", "afuera",
+    # German
+    "wetter", "regen", "regnet", "regenschirm", "anziehen", "kalt", "sonne", "sonnig", "schnee",
+    "schneit", "gewitter", "drau(?:ß|ss)en", "wäsche", "fahrrad", "strand", "joggen", "laufen",
+    # Portuguese
+    "chuva", "chove", "chover", "guarda-chuva", "vestir", "frio", "praia", "correr",
+]
+
+_WEATHER_PATTERN = re.compile(r"\b(?:" + "|".join(WEATHER_WORDS) + r")\b", re.IGNORECASE)
+
+# Messages the classifier must send down the fast path, and ones it must not
+WEATHER_EXAMPLES = [
+    "Should I take an umbrella today?",
+    "What should I wear tonight?",
+    "Is it too hot for a run?",
+    "Will it be windy at the beach tomorrow?",
+    "Che tempo fa a Roma?",
+    "Devo prendere l'ombrello?",
+    "Quel temps fait-il demain ?",
+    "¿Va a llover? ¿Necesito paraguas si hace frío?",
+    "Brauche ich einen Regenschirm? Ist es draußen kalt?",
+    "Vai chover amanhã?",
+]
+NOT_WEATHER_EXAMPLES = [
+    "Can you recommend a hotel near the station?",
+    "How do I resize windows on my desktop?",
+    "Please regenerate the summary",
+    "How many calories are in a pizza?",
+    "Is this a temporary fix?",
+    "Tell me about venture capital",
+    "I rely solely on you",
+    "What is the Python runtime?",
+    "Where can I park the car?",
+    "Translate 'hello' into French",
+]
+
+
+def is_weather_question(message: str) -> bool:
+    """Return True when the message likely needs current weather data to answer"""
+    return _WEATHER_PATTERN.search(message) is not None
+
+
+if __name__ == "__main__":
+    wrong = [m for m in WEATHER_EXAMPLES if not is_weather_question(m)]
+    wrong += [m for m in NOT_WEATHER_EXAMPLES if is_weather_question(m)]
+    for message in wrong:
+        print(f"⚠️ misclassified: {message}")
+    print(f"{len(WEATHER_EXAMPLES) + len(NOT_WEATHER_EXAMPLES) - len(wrong)} of "
+          f"{len(WEATHER_EXAMPLES) + len(NOT_WEATHER_EXAMPLES)} examples classified correctly")
+    raise SystemExit(1 if wrong else 0)
@@ -0,0 +1,187 @@
+"""Exact-match cache for LLM completions with LRU eviction and optional SQLite persistence"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+COMPLETION_CACHE_SIZE = int(os.getenv("COMPLETION_CACHE_SIZE", "256"))
+COMPLETION_CACHE_TTL = float(os.getenv("COMPLETION_CACHE_TTL", "900"))
+# SQLite file for persistence across restarts; empty keeps the cache in memory only
+COMPLETION_CACHE_PATH = os.getenv("COMPLETION_CACHE_PATH", "")
+COMPLETION_CACHE_DISK_SIZE = int(os.getenv("COMPLETION_CACHE_DISK_SIZE", "10000"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_text(text: Any, fold_case: bool = False) -> Any:
+    if not isinstance(text, str):
+        return text
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.casefold() if fold_case else text
+
+
+def _normalize_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only what affects the answer; tool call ids differ on every run"""
+    role = message.get("role")
+    normalized: Dict[str, Any] = {
+        "role": role,
+        "content": _normalize_text(message.get("content"), fold_case=role == "user"),
+    }
+    if message.get("tool_calls"):
+        normalized["tool_calls"] = [
+            [call["function"]["name"], call["function"].get("arguments") or "{}"]
+            for call in message["tool_calls"]
+        ]
+    if role == "tool":
+        normalized["name"] = message.get("name")
+    return normalized
+
+
+def completion_key(
+    messages: List[Dict[str, Any]],
+    model: str,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    context: Optional[str] = None,
+) -> str:
+    """Build a cache key from the normalized messages, model, tool set and context digest
+
+    context should identify anything outside the messages the answer depends
+    on, such as the current weather snapshot, so entries go stale when it changes.
+    """
+    material = {
+        "model": model,
+        "messages": [_normalize_message(message) for message in messages],
+        "tools": tools,
+        "context": context,
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SQLiteCompletionStore:
+    """On-disk completion store shared across restarts"""
+
+    def __init__(self, path: str, max_entries: int = COMPLETION_CACHE_DISK_SIZE):
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_created ON completions (created)")
+        self._writes = 0
+
+    def get(self, key: str, ttl: float) -> Optional[Tuple[float, str]]:
+        row = self._conn.execute(
+            "SELECT created, value FROM completions WHERE key = ? AND created > ?",
+            (key, time.time() - ttl),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, created: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO completions (key, value, created) VALUES (?, ?, ?)",
+            (key, value, created),
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Keep only the newest max_entries rows"""
+        self._conn.execute(
+            "DELETE FROM completions WHERE key NOT IN "
+            "(SELECT key FROM completions ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CompletionCache:
+    """In-memory LRU of completions with a TTL, optionally backed by SQLite"""
+
+    def __init__(
+        self,
+        max_entries: int = COMPLETION_CACHE_SIZE,
+        ttl: float = COMPLETION_CACHE_TTL,
+        path: str = COMPLETION_CACHE_PATH,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = SQLiteCompletionStore(path) if path and max_entries > 0 else None
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached completion, or None"""
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[0] >= self.ttl:
+            # Expired entries stay until evicted so get_stale can still serve them
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(entry[1])
+
+        if self.store is not None:
+            entry = self.store.get(key, self.ttl)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+                return json.loads(entry[1])
+
+        self.misses += 1
+        return None
+
+    def get_stale(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached completion regardless of age, for when the upstream is down"""
+        entry = self._entries.get(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key, float("inf"))
+        return json.loads(entry[1]) if entry is not None else None
+
+    def set(self, key: str, completion: Dict[str, Any]) -> None:
+        entry = (time.time(), json.dumps(completion))
+        self._remember(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry[1], entry[0])
+
+    def _remember(self, key: str, entry: Tuple[float, str]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit ratio"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": "sqlite" if self.store is not None else "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+        }
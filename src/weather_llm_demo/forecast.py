@@ -0,0 +1,156 @@
+"""Multi-day forecast parsed once into compact columns
+
+The Weather Underground forecast section holds per-day arrays (highs, lows,
+narratives) and a daypart series with two slots per day: slot 2*i is day i's
+daytime and slot 2*i+1 its night. The daytime slot of today is null once it
+has passed. parse_forecast converts the whole range to metric columns once;
+the columns are plain lists, so the same value goes into the in-process and
+the shared cache. Forecast reads views of it without copying the columns.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+# Days after tomorrow summarised in the default forecast (the full range stays cached)
+FORECAST_EXTENDED_DAYS = int(os.getenv("FORECAST_EXTENDED_DAYS", "5"))
+
+DAYPARTS = ("both", "day", "night")
+
+# Output field -> (daypart source key, conversion)
+_DAYPART_FIELDS = {
+    "name": ("daypartName", None),
+    "conditions": ("wxPhraseLong", None),
+    "narrative": ("narrative", None),
+    "temperature_c": ("temperature", "f_to_c"),
+    "precipitation_chance": ("precipChance", None),
+    "precipitation_type": ("precipType", None),
+    "precipitation_mm": ("qpf", "in_to_mm"),
+    "humidity": ("relativeHumidity", None),
+    "cloud_cover": ("cloudCover", None),
+    "wind_kmh": ("windSpeed", "mph_to_kmh"),
+    "wind_direction": ("windDirectionCardinal", None),
+    "uv_index": ("uvIndex", None),
+}
+
+
+def _f_to_c(value: Optional[float]) -> Optional[float]:
+    return round((value - 32) * 5 / 9, 1) if value is not None else None
+
+
+def _mph_to_kmh(value: Optional[float]) -> Optional[float]:
+    return round(value * 1.60934, 1) if value is not None else None
+
+
+def _in_to_mm(value: Optional[float]) -> Optional[float]:
+    return round(value * 25.4, 1) if value is not None else None
+
+
+_CONVERSIONS = {"f_to_c": _f_to_c, "mph_to_kmh": _mph_to_kmh, "in_to_mm": _in_to_mm}
+
+
+def _column(values: Optional[List[Any]], length: int, conversion: Optional[str] = None) -> List[Any]:
+    """The source array padded or cut to length, converted"""
+    values = list(values or [])[:length]
+    values += [None] * (length - len(values))
+    if conversion is None:
+        return values
+    convert = _CONVERSIONS[conversion]
+    return [convert(value) for value in values]
+
+
+def _time_of_day(timestamp: Optional[str]) -> Optional[str]:
+    """HH:MM from an ISO local timestamp such as 2024-07-15T05:50:00+0200"""
+    return timestamp[11:16] if timestamp and len(timestamp) >= 16 else None
+
+
+def parse_forecast(section: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the daypart section to day and daypart columns, in metric units"""
+    days = len(section.get("calendarDayTemperatureMax") or section.get("dayOfWeek") or [])
+    daypart = (section.get("daypart") or [{}])[0] or {}
+    slots = days * 2
+    return {
+        "days": {
+            "date": [value[:10] if value else None for value in _column(section.get("validTimeLocal"), days)],
+            "day_of_week": _column(section.get("dayOfWeek"), days),
+            "high_c": _column(section.get("calendarDayTemperatureMax"), days, "f_to_c"),
+            "low_c": _column(section.get("calendarDayTemperatureMin"), days, "f_to_c"),
+            "narrative": _column(section.get("narrative"), days),
+            "precipitation_mm": _column(section.get("qpf"), days, "in_to_mm"),
+            "sunrise": [_time_of_day(value) for value in _column(section.get("sunriseTimeLocal"), days)],
+            "sunset": [_time_of_day(value) for value in _column(section.get("sunsetTimeLocal"), days)],
+        },
+        "dayparts": {
+            field: _column(daypart.get(source), slots, conversion)
+            for field, (source, conversion) in _DAYPART_FIELDS.items()
+        },
+    }
+
+
+class Forecast:
+    """Read-only views of parsed forecast columns"""
+
+    __slots__ = ("days", "dayparts")
+
+    def __init__(self, columns: Dict[str, Any]):
+        self.days: Dict[str, List[Any]] = columns["days"]
+        self.dayparts: Dict[str, List[Any]] = columns["dayparts"]
+
+    def __len__(self) -> int:
+        return len(self.days["date"])
+
+    def daypart(self, slot: int) -> Optional[Dict[str, Any]]:
+        """One daypart slot without its empty fields, or None when the slot is empty"""
+        if self.dayparts["name"][slot] is None and self.dayparts["temperature_c"][slot] is None:
+            return None
+        return {field: values[slot] for field, values in self.dayparts.items() if values[slot] is not None}
+
+    def summary_day(self, index: int, narrative: bool = True) -> Dict[str, Any]:
+        """Day index in the short form of the default forecast
+
+        Precipitation chance and wind are the daytime ones; today's night is
+        used once the daytime has passed.
+        """
+        slot = 2 * index if self.dayparts["name"][2 * index] is not None else 2 * index + 1
+        day = {
+            "date": self.days["date"][index],
+            "day_of_week": self.days["day_of_week"][index],
+            "high_c": self.days["high_c"][index],
+            "low_c": self.days["low_c"][index],
+            "precipitation_chance": self.dayparts["precipitation_chance"][slot],
+            "wind_kmh": self.dayparts["wind_kmh"][slot],
+        }
+        if narrative:
+            day["conditions"] = self.days["narrative"][index]
+        return day
+
+    def summary(self, extended_days: int = FORECAST_EXTENDED_DAYS) -> Dict[str, Any]:
+        """Today, tomorrow and, without narratives, the following days"""
+        if len(self) < 2:
+            raise ValueError(f"Forecast has {len(self)} days, expected at least 2")
+        return {
+            "today": self.summary_day(0),
+            "tomorrow": self.summary_day(1),
+            "extended": [
+                self.summary_day(i, narrative=False) for i in range(2, min(len(self), 2 + max(extended_days, 0)))
+            ],
+        }
+
+    def select(self, start_day: int = 0, days: int = 3, daypart: str = "both") -> Dict[str, Any]:
+        """Detailed days start_day .. start_day + days - 1 (0 is today)
+
+        daypart is "both", "day" or "night". The range is clipped to the days
+        available.
+        """
+        if daypart not in DAYPARTS:
+            raise ValueError(f"daypart must be one of {', '.join(DAYPARTS)}")
+        start = min(max(start_day, 0), max(len(self) - 1, 0))
+        stop = min(start + max(days, 1), len(self))
+        selected = []
+        for index in range(start, stop):
+            day = {field: values[index] for field, values in self.days.items()}
+            if daypart != "night":
+                day["day"] = self.daypart(2 * index)
+            if daypart != "day":
+                day["night"] = self.daypart(2 * index + 1)
+            selected.append(day)
+        return {"start_day": start, "available_days": len(self), "days": selected}
@@ -0,0 +1,52 @@
+"""Long-lived pooled HTTP clients for the upstream services"""
+
+import os
+from typing import Dict, Optional
+
+import httpx
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(
+    prefix: str,
+    read_timeout: float = 10.0,
+    headers: Optional[Dict[str, str]] = None,
+) -> httpx.AsyncClient:
+    """Create a pooled AsyncClient configured from <prefix>_* environment variables
+
+    Supported variables: MAX_CONNECTIONS, MAX_KEEPALIVE, KEEPALIVE_EXPIRY, HTTP2,
+    CONNECT_TIMEOUT, READ_TIMEOUT, WRITE_TIMEOUT and POOL_TIMEOUT.
+    """
+    limits = httpx.Limits(
+        max_connections=_env_int(f"{prefix}_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=_env_int(f"{prefix}_MAX_KEEPALIVE", 10),
+        keepalive_expiry=_env_float(f"{prefix}_KEEPALIVE_EXPIRY", 30.0),
+    )
+    timeout = httpx.Timeout(
+        connect=_env_float(f"{prefix}_CONNECT_TIMEOUT", 5.0),
+        read=_env_float(f"{prefix}_READ_TIMEOUT", read_timeout),
+        write=_env_float(f"{prefix}_WRITE_TIMEOUT", 10.0),
+        pool=_env_float(f"{prefix}_POOL_TIMEOUT", 5.0),
+    )
+
+    http2 = os.getenv(f"{prefix}_HTTP2", "false").lower() in ("1", "true", "yes")
+    if http2 and not _http2_available():
+        print(f"⚠️  {prefix}_HTTP2 is enabled but the 'h2' package is missing. Using HTTP/1.1.")
+        http2 = False
+
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2, headers=headers)
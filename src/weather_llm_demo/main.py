@@ -1,18 +1,124 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from pathlib import Path
+from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
+import json
+import logging
 import os
-from dotenv import load_dotenv
-from .weather_agent import WeatherAgent
+import time
+from .weather_agent import WeatherAgent, weather_cache
+from .observation_store import observation_store
+from .registry import StationRegistry
 from .mcp_server import MCPWeatherServer
+from .mcp_transport import MCPProtocol
 from .openrouter_client import OpenRouterClient
-# Load environment variables from .env file
-load_dotenv()
-app = FastAPI(title="Weather LLM Demo")
+from .http_client import create_http_client
+from .poller import WeatherPoller
+from .classifier import is_weather_question
+from .resilience import UpstreamUnavailable, openrouter_upstream, weather_upstream
+from .admission import (
+    AdmissionController,
+    Rejected,
+    TokenBucketLimiter,
+    RATE_LIMIT_BATCH_BURST,
+    RATE_LIMIT_BATCH_ITEMS_PER_MINUTE,
+    RATE_LIMIT_TRUST_PROXY,
+)
+from .sessions import Session, SessionStore
+from .tool_payload import render_tool_result
+from .metrics import (
+    REQUEST_SECONDS,
+    Gauge,
+    log_timing,
+    new_request_id,
+    render_metrics,
+    request_id_var,
+    timed,
+    timing_logger,
+)
+# Structured timing logs: one JSON object per line
+if not timing_logger.handlers:
+    _timing_handler = logging.StreamHandler()
+    _timing_handler.setFormatter(logging.Formatter("%(message)s"))
+    timing_logger.addHandler(_timing_handler)
+    timing_logger.setLevel(os.getenv("TIMING_LOG_LEVEL", "INFO").upper())
+    timing_logger.propagate = False
+
+
+# Warm the weather cache before serving, waiting at most STARTUP_PREWARM_TIMEOUT seconds
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "false").lower() in ("1", "true", "yes")
+STARTUP_PREWARM_TIMEOUT = float(os.getenv("STARTUP_PREWARM_TIMEOUT", "10"))
+
+# Long-lived components, created by build_components when the app starts
+station_registry: StationRegistry
+weather_agent: WeatherAgent
+mcp_server: MCPWeatherServer
+mcp_protocol: MCPProtocol
+openrouter_client: OpenRouterClient
+weather_poller: WeatherPoller
+
+
+def build_components() -> None:
+    """Create the components; the MCP server and the poller share the default station's agent"""
+    global station_registry, weather_agent, mcp_server, mcp_protocol, openrouter_client, weather_poller
+    station_registry = StationRegistry()
+    weather_agent = station_registry.get()
+    mcp_server = MCPWeatherServer(station_registry)
+    mcp_protocol = MCPProtocol(mcp_server)
+    openrouter_client = OpenRouterClient()
+    weather_poller = WeatherPoller(weather_agent)
+
+
+async def prewarm() -> None:
+    """Fetch the default station's snapshot and every configured station into the cache"""
+    others = [station["station_id"] for station in station_registry.list_stations() if not station["default"]]
+    await asyncio.gather(weather_poller.refresh(), station_registry.get_many(others))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the components and one pooled HTTP client per upstream; close them on shutdown"""
+    started = time.perf_counter()
+    build_components()
+    weather_http = create_http_client("WEATHER_HTTP", headers=weather_agent.headers)
+    openrouter_http = create_http_client("OPENROUTER_HTTP", read_timeout=30.0)
+    station_registry.client = weather_http
+    openrouter_client.client = openrouter_http
+
+    warming: Optional[asyncio.Task] = None
+    if STARTUP_PREWARM:
+        warming = asyncio.ensure_future(prewarm())
+        try:
+            # Shielded: on timeout warming continues in the background
+            await asyncio.wait_for(asyncio.shield(warming), STARTUP_PREWARM_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️  Cache pre-warm still running after {STARTUP_PREWARM_TIMEOUT:g}s; serving anyway")
+        except Exception as e:
+            print(f"⚠️  Cache pre-warm failed: {e}")
+    weather_poller.start()
+    log_timing(
+        "startup",
+        duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        prewarmed=warming is not None and warming.done() and not warming.exception(),
+    )
+    try:
+        yield
+    finally:
+        if warming is not None and not warming.done():
+            warming.cancel()
+        await weather_poller.stop()
+        await weather_http.aclose()
+        await openrouter_http.aclose()
+        if weather_cache.shared is not None:
+            await weather_cache.shared.close()
+
+
+app = FastAPI(title="Weather LLM Demo", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -23,10 +129,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-weather_agent = WeatherAgent()
-mcp_server = MCPWeatherServer()
-openrouter_client = OpenRouterClient()
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    """Tag each request with an id and record how long it took"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route_path, status=str(status))
+        log_timing(
+            "request",
+            method=request.method,
+            path=request.url.path,
+            status=status,
+            duration_ms=round(elapsed * 1000, 2),
+        )
+        request_id_var.reset(token)
+
+Gauge("weather_llm_weather_cache_hits", "Weather cache fresh hits", lambda: weather_cache.hits)
+Gauge("weather_llm_weather_cache_stale_hits", "Weather cache stale hits", lambda: weather_cache.stale_hits)
+Gauge("weather_llm_weather_cache_misses", "Weather cache misses", lambda: weather_cache.misses)
+Gauge("weather_llm_completion_cache_hits", "LLM completion cache hits", lambda: openrouter_client.cache.hits + openrouter_client.cache.disk_hits)
+Gauge("weather_llm_completion_cache_misses", "LLM completion cache misses", lambda: openrouter_client.cache.misses)
+
+# Per-client rate limiting and the global cap on in-flight chat requests
+rate_limiter = TokenBucketLimiter()
+batch_rate_limiter = TokenBucketLimiter(RATE_LIMIT_BATCH_ITEMS_PER_MINUTE, RATE_LIMIT_BATCH_BURST)
+admission = AdmissionController()
+Gauge("weather_llm_chat_in_flight", "Chat requests currently running", lambda: admission.in_flight)
+Gauge("weather_llm_chat_queue_depth", "Chat requests waiting for a slot", lambda: admission.waiting)
+# Conversation history per session id, in this process only
+sessions = SessionStore()
+Gauge("weather_llm_chat_sessions", "Chat sessions held in memory", lambda: len(sessions))
+
+# Seconds between keep-alive comments on idle weather streams
+WEATHER_STREAM_KEEPALIVE = 15
+
+# Answer weather questions in one LLM round trip by injecting the cached snapshot
+CHAT_FAST_PATH = os.getenv("CHAT_FAST_PATH", "false").lower() in ("1", "true", "yes")
+# Batch chat: prompts accepted per request, and completions run at once per batch
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "500"))
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "4"))
 
 # Get station ID from environment variables
 STATION_ID = os.getenv("STATION_ID")
@@ -43,6 +196,10 @@ Use the get_all_weather tool if the user asks about:
 - Commute or transportation advice
 - Health or comfort concerns related to weather
 
+Use the get_forecast_days tool, asking only for the days needed, if the user asks about specific later days (e.g. the weekend or a given weekday) or about day versus night.
+
+Use the get_weather_history tool if the user asks how the weather has changed, or about earlier today or previous days.
+
 For all other requests (general questions, indoor activities, non-weather topics), respond without weather data.
 
 ## CRITICAL INSTRUCTIONS:
@@ -102,12 +259,34 @@ Remember: Your advice could affect someone's comfort, health, and safety. Be spe
 class ChatRequest(BaseModel):
     message: str
     include_forecast: bool = True
+    fast_path: Optional[bool] = None  # Overrides CHAT_FAST_PATH
+    session_id: Optional[str] = Field(None, max_length=64)  # Continue a conversation; omitted starts a new one
 
 
 class ChatResponse(BaseModel):
     response: str
     weather_data: Optional[Dict[str, Any]] = None
     tool_calls: Optional[List[str]] = None
+    path: Optional[str] = None  # "fast", "tools" or "direct"
+    llm_calls: int = 0
+    stale: bool = False  # answered from a cached completion while the LLM is unavailable
+    session_id: Optional[str] = None  # Send back to continue the conversation
+
+
+class BatchChatItem(BaseModel):
+    message: str
+    station: Optional[str] = None  # Default station if omitted
+    id: Optional[str] = None  # Echoed back to match results to prompts
+
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1)  # Capped at CHAT_BATCH_CONCURRENCY
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @app.get("/")
@@ -118,122 +297,604 @@ async def root():
     return {"message": "Weather LLM Demo API - Please create index.html"}
 
 
+def get_station_agent(station: Optional[str]) -> WeatherAgent:
+    """Return the agent for a station, or 404 if it is unknown"""
+    try:
+        return station_registry.get(station)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/stations")
+async def get_stations():
+    """List the configured weather stations"""
+    return station_registry.list_stations()
+
+
 @app.get("/api/weather/current")
-async def get_current_weather():
+async def get_current_weather(station: Optional[str] = None):
     """Get current weather conditions"""
+    agent = get_station_agent(station)
     try:
-        data = await weather_agent.get_current_conditions()
+        data = await agent.get_current_conditions()
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/weather/forecast")
-async def get_forecast():
-    """Get weather forecast"""
+async def get_forecast(
+    station: Optional[str] = None,
+    start_day: Optional[int] = Query(None, ge=0, le=14),
+    days: Optional[int] = Query(None, ge=1, le=15),
+    daypart: Optional[str] = Query(None, pattern="^(both|day|night)$"),
+):
+    """Get weather forecast; with start_day, days or daypart, the detailed days of that range"""
+    agent = get_station_agent(station)
     try:
-        data = await weather_agent.get_forecast()
+        if start_day is None and days is None and daypart is None:
+            return await agent.get_forecast()
+        data = await agent.get_forecast_range(start_day or 0, days or 3, daypart or "both")
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/weather/all")
-async def get_all_weather():
+async def get_all_weather(station: Optional[str] = None):
     """Get all weather data"""
+    agent = get_station_agent(station)
+    if agent is weather_agent and weather_poller.snapshot is not None:
+        return weather_poller.snapshot
     try:
-        data = await weather_agent.get_all_weather_data()
+        data = await agent.get_all_weather_data()
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/weather/history")
+async def get_weather_history(
+    station: Optional[str] = None,
+    hours: float = Query(24, gt=0, le=24 * 366, description="Hours back from end, used when start is omitted"),
+    start: Optional[int] = Query(None, description="Range start, Unix epoch seconds"),
+    end: Optional[int] = Query(None, description="Range end, Unix epoch seconds (default: now)"),
+    bucket: int = Query(3600, ge=0, description="Downsampling bucket in seconds; 0 returns raw observations"),
+):
+    """Get stored observations for a time range, with min/max/avg per bucket"""
+    agent = get_station_agent(station)
+    try:
+        return await agent.get_history(hours=hours, start=start, end=end, bucket=bucket)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/weather/history/stats")
+async def get_weather_history_stats():
+    """Get observation store size and insert counters"""
+    return observation_store.stats()
+
+
+@app.get("/api/weather/bulk")
+async def get_bulk_weather(
+    stations: Optional[str] = Query(None, description="Comma-separated station ids; all configured stations if omitted"),
+    kind: str = Query("all", pattern="^(all|current|forecast)$"),
+):
+    """Fetch many stations concurrently under a global concurrency cap"""
+    if stations:
+        station_ids = [station.strip() for station in stations.split(",") if station.strip()]
+    else:
+        station_ids = [station["station_id"] for station in station_registry.list_stations()]
+    if len(station_ids) > station_registry.max_stations:
+        raise HTTPException(status_code=400, detail=f"Too many stations (limit {station_registry.max_stations})")
+    return await station_registry.get_many(station_ids, kind=kind)
+
+
+@app.get("/api/weather/stream")
+async def stream_weather():
+    """Push the latest weather snapshot as Server-Sent Events whenever it changes"""
+
+    async def events() -> AsyncIterator[str]:
+        queue = weather_poller.subscribe()
+        try:
+            if weather_poller.snapshot is not None:
+                yield sse_event("weather", weather_poller.snapshot)
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), WEATHER_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("weather", snapshot)
+        finally:
+            weather_poller.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/weather/cache")
+async def get_weather_cache_stats():
+    """Get weather cache hit/miss counters and entry ages"""
+    return weather_cache.stats()
+
+
 @app.get("/api/mcp/tools")
 async def get_mcp_tools():
     """Get MCP tools definition"""
     return mcp_server.get_tools_definition()
 
 
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP streamable HTTP transport: one JSON-RPC message or batch per POST"""
+    response = await mcp_protocol.handle_raw(await request.body())
+    if response is None:
+        return Response(status_code=202)
+    return JSONResponse(response)
+
+
+@app.get("/mcp")
+async def mcp_stream():
+    """No server-initiated stream is offered"""
+    return Response(status_code=405, headers={"Allow": "POST"})
+
+
+WEATHER_TOOLS = ["get_current_weather", "get_weather_forecast", "get_all_weather"]
+
+
+async def execute_tool_calls(
+    tool_calls: List[Dict[str, Any]], messages: List[Dict[str, Any]], session: Optional[Session] = None
+) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """Run the model's tool calls and append their results to messages
+
+    Results already sent earlier in the session are appended as references.
+    Returns the names of the tools that were called and the weather data, if any.
+    """
+    # Parse each tool call
+    tool_calls_made = []
+    parsed_calls = []
+    for tool_call in tool_calls:
+        tool_name = tool_call["function"]["name"]
+        # Parse tool arguments if they exist
+        tool_args_str = tool_call["function"].get("arguments", "{}")
+        try:
+            tool_args = json.loads(tool_args_str) if tool_args_str else {}
+        except json.JSONDecodeError:
+            tool_args = {}
+
+        # Track tool calls made
+        tool_calls_made.append(tool_name)
+        parsed_calls.append((tool_name, tool_args))
+
+    # Execute the tools concurrently; a failing tool only affects its own result
+    with timed("tool_execution", tools=tool_calls_made):
+        tool_results = await mcp_server.handle_tool_calls(parsed_calls)
+
+    weather_data = None
+    for tool_call, tool_result in zip(tool_calls, tool_results):
+        tool_name = tool_result["tool_name"]
+
+        # Store weather data if this is a weather tool
+        if tool_name in WEATHER_TOOLS:
+            weather_data = tool_result["result"]
+
+        # Append tool result message, in the compact form rendered once per cached result
+        content = render_tool_result(tool_name, tool_result["result"])
+        if session is not None:
+            messages.append(session.tool_message(tool_call["id"], tool_name, content))
+            continue
+        messages.append({
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "name": tool_name,
+            "content": content,
+        })
+
+    return tool_calls_made, weather_data
+
+
+async def prefetch_weather(request: ChatRequest) -> Optional[Dict[str, Any]]:
+    """Return the weather snapshot to inject when the fast path applies"""
+    fast_path = request.fast_path if request.fast_path is not None else CHAT_FAST_PATH
+    if not fast_path or not is_weather_question(request.message):
+        return None
+    if weather_poller.snapshot is not None:
+        return weather_poller.snapshot
+    return await weather_agent.get_all_weather_data()
+
+
+def inject_weather(
+    messages: List[Dict[str, Any]], weather_data: Dict[str, Any], session: Optional[Session] = None
+) -> None:
+    """Append a pre-executed get_all_weather call and its result to messages
+
+    This is the same context the second call of the tool flow sees, so the model
+    can answer straight away. Nothing is added if the session already has it.
+    """
+    content = render_tool_result("get_all_weather", weather_data)
+    if session is not None and session.has_tool_result(content):
+        return
+    call_id = "prefetched_get_all_weather"
+    messages.append({
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "get_all_weather", "arguments": "{}"}}],
+    })
+    messages.append({
+        "role": "tool",
+        "tool_call_id": call_id,
+        "name": "get_all_weather",
+        "content": content,
+    })
+
+
+def client_id(http_request: Request) -> str:
+    """Identify the caller for rate limiting"""
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = http_request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def check_rate_limit(http_request: Request, limiter: Optional[TokenBucketLimiter] = None, cost: int = 1) -> None:
+    """Raise a 429 with Retry-After when the caller is over its rate"""
+    try:
+        (limiter or rate_limiter).check(client_id(http_request), cost)
+    except Rejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+
+
+async def acquire_chat_slot() -> None:
+    """Wait for an in-flight slot or raise a 503 with Retry-After"""
+    try:
+        await admission.acquire()
+    except Rejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse holding an admission slot until the response ends
+
+    The slot is released however the response ends, including when the client
+    goes away before the body is read.
+    """
+
+    def __init__(self, content: AsyncIterator[str], started: float, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.started = started
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.release(time.monotonic() - self.started)
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """Chat endpoint with weather-aware responses"""
+    check_rate_limit(http_request)
+    await acquire_chat_slot()
+    started = time.monotonic()
     try:
-        import json
-        
-        # Prepare messages for OpenRouter
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": request.message},
-        ]
+        return await answer_chat(request)
+    finally:
+        admission.release(time.monotonic() - started)
+
+
+async def answer_chat(request: ChatRequest) -> ChatResponse:
+    """Answer one chat message in its session, one turn at a time"""
+    session = sessions.get_or_create(request.session_id)
+    async with session.lock:
+        return await answer_turn(request, session)
+
+
+async def answer_turn(request: ChatRequest, session: Session) -> ChatResponse:
+    """Answer one chat message, using the fast path or the tool flow"""
+    try:
+        # Prepare messages for OpenRouter: system prompt, session history, new message
+        messages = session.messages(SYSTEM_PROMPT, request.message)
+        turn_start = len(messages) - 1
+
+        # Fast path: the classifier says weather is needed, so the snapshot goes
+        # into the first prompt. The tools stay available for history and later days.
+        path = "direct"
+        weather_data = await prefetch_weather(request)
+        if weather_data is not None:
+            inject_weather(messages, weather_data, session)
+            path = "fast"
 
         # Get tools from MCP server
         tools = mcp_server.get_openrouter_tools()
 
-        # Initial API call with tools
-        response = await openrouter_client.create_completion(
-            messages=messages, tools=tools
-        )
+        # Initial API call with tools; cached answers expire when the weather changes
+        with timed("llm_first_call", path=path):
+            response = await openrouter_client.create_completion(
+                messages=messages, tools=tools, cache_context=weather_poller.digest
+            )
 
         # Extract response message
         response_message = response["choices"][0]["message"]
+        stale = bool(response.get("stale"))
         
         # Initialize tracking variables
         tool_calls_made = []
-        weather_data = None
 
         # Check if the response contains tool calls
         if "tool_calls" in response_message and response_message["tool_calls"]:
-            # Process tool calls
-            tool_calls = response_message["tool_calls"]
-            
             # Append the original assistant message with tool calls
             messages.append(response_message)
-            
-            # Process each tool call
-            for tool_call in tool_calls:
-                tool_name = tool_call["function"]["name"]
-                # Parse tool arguments if they exist
-                tool_args_str = tool_call["function"].get("arguments", "{}")
-                try:
-                    tool_args = json.loads(tool_args_str) if tool_args_str else {}
-                except json.JSONDecodeError:
-                    tool_args = {}
-                
-                # Track tool calls made
-                tool_calls_made.append(tool_name)
-                
-                # Execute the tool
-                tool_result = await mcp_server.handle_tool_call(tool_name, tool_args)
-                
-                # Store weather data if this is a weather tool
-                if tool_name in ["get_current_weather", "get_weather_forecast", "get_all_weather"]:
-                    weather_data = tool_result["result"]
-                
-                # Append tool result message
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "name": tool_name,
-                    "content": json.dumps(tool_result["result"])  # JSON-serialize the result
-                })
+
+            tool_calls_made, tool_weather = await execute_tool_calls(
+                response_message["tool_calls"], messages, session
+            )
+            weather_data = tool_weather or weather_data
             
             # Second API call without tools to get final response
-            response = await openrouter_client.create_completion(messages=messages)
+            with timed("llm_second_call"):
+                response = await openrouter_client.create_completion(messages=messages)
             response_message = response["choices"][0]["message"]
+            stale = stale or bool(response.get("stale"))
+            path = "tools"
         
         # Extract final response text
         response_text = response_message.get("content", "") or ""
+        session.record(messages[turn_start:] + [{"role": "assistant", "content": response_text}])
 
         return ChatResponse(
             response=response_text,
             weather_data=weather_data,
             tool_calls=tool_calls_made if tool_calls_made else None,
+            path=path,
+            llm_calls=2 if path == "tools" else 1,
+            stale=stale,
+            session_id=session.id,
         )
 
+    except UpstreamUnavailable as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
+        timing_logger.exception("chat failed (request_id=%s)", request_id_var.get())
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Chat endpoint streaming tokens, tool calls and weather data as Server-Sent Events
+
+    Events: token, tool_call, weather_data, done and error.
+    """
+    check_rate_limit(http_request)
+    await acquire_chat_slot()
+    started = time.monotonic()
+    try:
+        request_id = request_id_var.get()
+        session = sessions.get_or_create(request.session_id)
+    except BaseException:
+        admission.release(time.monotonic() - started)
+        raise
+
+    async def events() -> AsyncIterator[str]:
+        async with session.lock:
+            async for chunk in chat_events():
+                yield chunk
+
+    async def chat_events() -> AsyncIterator[str]:
+        request_id_var.set(request_id)
+        messages = session.messages(SYSTEM_PROMPT, request.message)
+        turn_start = len(messages) - 1
+        tool_calls_made: List[str] = []
+        tools = mcp_server.get_openrouter_tools()
+        path = "direct"
+        stale = False
+        try:
+            weather_data = await prefetch_weather(request)
+            if weather_data is not None:
+                yield sse_event("weather_data", weather_data)
+                inject_weather(messages, weather_data, session)
+                # Tools stay available for history and later days
+                path = "fast"
+
+            while True:
+                response_message = None
+                with timed("llm_second_call" if path == "tools" else "llm_first_call", path=path):
+                    async for event in openrouter_client.stream_completion(
+                        messages, tools=tools, cache_context=weather_poller.digest
+                    ):
+                        if event["type"] == "token":
+                            yield sse_event("token", {"content": event["content"]})
+                        else:
+                            response_message = event["message"]
+                            stale = stale or event.get("stale", False)
+
+                if tools is None or not (response_message or {}).get("tool_calls"):
+                    break
+
+                # Run the requested tools, then stream the final answer without tools
+                messages.append(response_message)
+                for tool_call in response_message["tool_calls"]:
+                    yield sse_event(
+                        "tool_call",
+                        {"name": tool_call["function"]["name"], "arguments": tool_call["function"].get("arguments") or "{}"},
+                    )
+                names, weather_data = await execute_tool_calls(response_message["tool_calls"], messages, session)
+                tool_calls_made.extend(names)
+                if weather_data is not None:
+                    yield sse_event("weather_data", weather_data)
+                tools = None
+                path = "tools"
+
+            answer = (response_message or {}).get("content") or ""
+            session.record(messages[turn_start:] + [{"role": "assistant", "content": answer}])
+            yield sse_event(
+                "done", {"tool_calls": tool_calls_made or None, "path": path, "stale": stale, "session_id": session.id}
+            )
+        except UpstreamUnavailable as e:
+            yield sse_event("error", {"detail": str(e), "retry_after": round(e.retry_after)})
+        except Exception as e:
+            timing_logger.exception("chat stream failed (request_id=%s)", request_id)
+            yield sse_event("error", {"detail": str(e)})
+
+    return SlotStreamingResponse(
+        events(),
+        started,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """Answer many prompts, streaming one NDJSON result per line as each finishes
+
+    Each distinct station's weather is fetched once and injected into every
+    prompt for it, so each answer takes one LLM call. A final line summarizes
+    the batch.
+    """
+    if len(request.items) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (limit {CHAT_BATCH_MAX_ITEMS})")
+    # Charged per prompt to the batch bucket; admission slots bound the completions
+    check_rate_limit(http_request, batch_rate_limiter, len(request.items))
+    concurrency = min(request.concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_CONCURRENCY)
+    request_id = request_id_var.get()
+
+    async def lines() -> AsyncIterator[str]:
+        request_id_var.set(request_id)
+        started = time.monotonic()
+        weather, weather_ms = await batch_weather([item.station for item in request.items])
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, item: BatchChatItem) -> Dict[str, Any]:
+            async with semaphore:
+                return await answer_batch_item(index, item, weather[item.station or station_registry.default_station_id])
+
+        errors = 0
+        tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(request.items)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                errors += "error" in result
+                yield json.dumps(result) + "\n"
+        finally:
+            # The client went away: stop the remaining completions
+            for task in tasks:
+                task.cancel()
+        yield json.dumps(
+            {
+                "done": True,
+                "items": len(request.items),
+                "errors": errors,
+                "stations": sum("error" not in data for data in weather.values()),
+                "weather_ms": weather_ms,
+                "concurrency": concurrency,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+        ) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def batch_weather(stations: List[Optional[str]]) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """Fetch each distinct station once; the default station uses the polled snapshot"""
+    started = time.monotonic()
+    station_ids = list(dict.fromkeys(station or station_registry.default_station_id for station in stations))
+    weather: Dict[str, Dict[str, Any]] = {}
+    if weather_poller.snapshot is not None and station_registry.default_station_id in station_ids:
+        weather[station_registry.default_station_id] = weather_poller.snapshot
+    with timed("batch_weather", stations=len(station_ids)):
+        weather.update(await station_registry.get_many([s for s in station_ids if s not in weather]))
+    return weather, round((time.monotonic() - started) * 1000, 1)
+
+
+async def answer_batch_item(index: int, item: BatchChatItem, weather_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer one batch prompt with its station's weather injected; errors stay in the result"""
+    result: Dict[str, Any] = {"index": index, "id": item.id, "station": item.station or station_registry.default_station_id}
+    started = time.monotonic()
+    if "error" in weather_data:
+        result["error"] = weather_data["error"]
+        return result
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": item.message},
+    ]
+    inject_weather(messages, weather_data)
+    try:
+        async with admission.slot():
+            queued_ms = round((time.monotonic() - started) * 1000, 1)
+            with timed("llm_first_call", path="batch"):
+                response = await openrouter_client.create_completion(messages=messages)
+        result.update(
+            response=response["choices"][0]["message"].get("content", "") or "",
+            stale=bool(response.get("stale")),
+            queued_ms=queued_ms,
+        )
+    except (Rejected, UpstreamUnavailable) as e:
+        result.update(error=str(e), retry_after=round(e.retry_after))
+    except Exception as e:
+        timing_logger.exception("batch item %d failed (request_id=%s)", index, request_id_var.get())
+        result["error"] = str(e)
+    result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+
+@app.get("/api/upstreams")
+async def get_upstream_stats():
+    """Get retry settings and circuit breaker state per upstream"""
+    return {"weather": weather_upstream.stats(), "openrouter": openrouter_upstream.stats()}
+
+
+@app.get("/api/chat/admission")
+async def get_admission_stats():
+    """Get rate limiter and admission queue counters"""
+    return {
+        "rate_limit": rate_limiter.stats(),
+        "batch_rate_limit": batch_rate_limiter.stats(),
+        "admission": admission.stats(),
+    }
+
+
+@app.get("/api/chat/sessions")
+async def get_session_stats():
+    """Get chat session counts and history sizes"""
+    return sessions.stats()
+
+
+@app.get("/api/chat/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Get one session's history size and deduplication counters"""
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return session.stats()
+
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a session's history"""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"deleted": session_id}
+
+
+@app.get("/api/chat/cache")
+async def get_completion_cache_stats():
+    """Get LLM completion cache hit ratio and size"""
+    return openrouter_client.cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage latency histograms and fallback counters"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/health")
 async def health():
     """Health check endpoint"""
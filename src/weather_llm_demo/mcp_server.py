@@ -1,66 +1,184 @@
-"""MCP (Model Context Protocol) Server for Weather Agent"""
+"""MCP (Model Context Protocol) Server for Weather Agent
 
-from typing import Dict, Any, List, Optional
+Tools are declared once as ToolSpec entries; both the MCP and the OpenRouter
+tool schemas are generated from them. Every tool reads through the shared
+weather cache, so a call for a warm station does not touch Weather Underground.
+The JSON-RPC transports (stdio and HTTP) are in mcp_transport.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .forecast import DAYPARTS
 from .weather_agent import WeatherAgent
+from .registry import StationRegistry
+
+# Bounds for running several tool calls from one model turn
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "20"))
+
+# Every weather tool takes an optional station
+STATION_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "station_id": {
+            "type": "string",
+            "description": "Weather Underground station id. Omit to use the default station.",
+        }
+    },
+    "required": [],
+}
+
+HISTORY_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "station_id": STATION_PARAMETERS["properties"]["station_id"],
+        "hours": {
+            "type": "integer",
+            "description": "How many hours back from now to return (default 24)",
+            "minimum": 1,
+            "maximum": 720,
+        },
+        "interval": {
+            "type": "string",
+            "enum": ["hourly", "raw"],
+            "description": "hourly: min/max/avg per hour (default); raw: every stored observation",
+        },
+    },
+    "required": [],
+}
+
+FORECAST_RANGE_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "station_id": STATION_PARAMETERS["properties"]["station_id"],
+        "start_day": {
+            "type": "integer",
+            "description": "First day to return: 0 is today, 1 tomorrow (default 0)",
+            "minimum": 0,
+            "maximum": 14,
+        },
+        "days": {
+            "type": "integer",
+            "description": "How many days to return (default 3)",
+            "minimum": 1,
+            "maximum": 15,
+        },
+        "daypart": {
+            "type": "string",
+            "enum": list(DAYPARTS),
+            "description": "Return the daytime part, the night part or both (default)",
+        },
+    },
+    "required": [],
+}
+
+ToolHandler = Callable[[WeatherAgent, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class ToolSpec:
+    """One tool: its name, description, JSON Schema parameters and handler
+
+    The handler receives the agent for the requested station and the arguments.
+    """
+
+    __slots__ = ("name", "description", "parameters", "handler")
+
+    def __init__(self, name: str, description: str, parameters: Dict[str, Any], handler: ToolHandler):
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+
+    def mcp_schema(self) -> Dict[str, Any]:
+        """The tool as listed by MCP tools/list"""
+        return {"name": self.name, "description": self.description, "inputSchema": self.parameters}
+
+    def definition(self) -> Dict[str, Any]:
+        """The tool as listed by /api/mcp/tools (input_schema, unlike tools/list)"""
+        return {"name": self.name, "description": self.description, "input_schema": self.parameters}
+
+    def openrouter_schema(self) -> Dict[str, Any]:
+        """The tool in OpenRouter (OpenAI function calling) format"""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+
+async def _current(agent: WeatherAgent, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await agent.get_current_conditions()
+
+
+async def _forecast(agent: WeatherAgent, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await agent.get_forecast()
+
+
+async def _all(agent: WeatherAgent, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await agent.get_all_weather_data()
+
+
+async def _forecast_range(agent: WeatherAgent, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return await agent.get_forecast_range(
+            start_day=int(arguments.get("start_day") or 0),
+            days=int(arguments.get("days") or 3),
+            daypart=arguments.get("daypart") or "both",
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+async def _history(agent: WeatherAgent, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    hours = min(max(int(arguments.get("hours") or 24), 1), 720)
+    bucket = 0 if arguments.get("interval") == "raw" else 3600
+    return await agent.get_history(hours=hours, bucket=bucket)
+
+
+TOOLS: Dict[str, ToolSpec] = {
+    spec.name: spec
+    for spec in (
+        ToolSpec(
+            "get_current_weather",
+            "Get current weather conditions from a station (default: Rome station IROME8278)",
+            STATION_PARAMETERS,
+            _current,
+        ),
+        ToolSpec("get_weather_forecast", "Get weather forecast for a station (default: Rome)", STATION_PARAMETERS, _forecast),
+        ToolSpec("get_all_weather", "Get both current conditions and forecast", STATION_PARAMETERS, _all),
+        ToolSpec(
+            "get_forecast_days",
+            "Get the detailed forecast for a range of days (0 = today, up to 15 days), with day and night "
+            "parts; each day carries its date and weekday. Use it for questions about specific later days, "
+            "such as the weekend.",
+            FORECAST_RANGE_PARAMETERS,
+            _forecast_range,
+        ),
+        ToolSpec(
+            "get_weather_history",
+            "Get recorded observations for the past hours, for trends and comparisons",
+            HISTORY_PARAMETERS,
+            _history,
+        ),
+    )
+}
 
 
 class MCPWeatherServer:
     """MCP-compliant weather tool server"""
 
-    def __init__(self):
-        self.weather_agent = WeatherAgent()
-        self.tools = self._define_tools()
-
-    def _define_tools(self) -> List[Dict[str, Any]]:
-        """Define available tools in MCP format"""
-        # Define tools in OpenRouter format
-        self.openrouter_tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_current_weather",
-                    "description": "Get current weather conditions from Rome station IROME8278",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                "name": "get_weather_forecast",
-                "description": "Get weather forecast for Rome",
-                "parameters": {"type": "object", "properties": {}, "required": []},
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_all_weather",
-                    "description": "Get both current conditions and forecast",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
-                }
-            },
-        ]
-        
-        # Preserve existing MCP format for backward compatibility
-        self.mcp_tools = [
-            {
-                "name": "get_current_weather",
-                "description": "Get current weather conditions from Rome station IROME8278",
-                "input_schema": {"type": "object", "properties": {}, "required": []},
-            },
-            {
-                "name": "get_weather_forecast",
-                "description": "Get weather forecast for Rome",
-                "input_schema": {"type": "object", "properties": {}, "required": []},
-            },
-            {
-                "name": "get_all_weather",
-                "description": "Get both current conditions and forecast",
-                "input_schema": {"type": "object", "properties": {}, "required": []},
-            },
-        ]
-        
-        return self.mcp_tools
+    def __init__(self, registry: Optional[StationRegistry] = None, tools: Optional[Dict[str, ToolSpec]] = None):
+        self.registry = registry if registry is not None else StationRegistry()
+        self.specs = tools if tools is not None else TOOLS
+        # Every format is generated once from the specs
+        self.mcp_tools = [spec.mcp_schema() for spec in self.specs.values()]
+        self.openrouter_tools = [spec.openrouter_schema() for spec in self.specs.values()]
+        self.tools = [spec.definition() for spec in self.specs.values()]
+
+    @property
+    def weather_agent(self) -> WeatherAgent:
+        """Agent for the default station"""
+        return self.registry.get()
 
     def get_openrouter_tools(self) -> List[Dict[str, Any]]:
         """Return tools definition in OpenRouter format"""
@@ -70,14 +188,17 @@ class MCPWeatherServer:
         self, tool_name: str, arguments: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Handle MCP tool calls"""
-        if tool_name == "get_current_weather":
-            result = await self.weather_agent.get_current_conditions()
-        elif tool_name == "get_weather_forecast":
-            result = await self.weather_agent.get_forecast()
-        elif tool_name == "get_all_weather":
-            result = await self.weather_agent.get_all_weather_data()
+        arguments = arguments or {}
+        spec = self.specs.get(tool_name)
+        if spec is None:
+            result: Dict[str, Any] = {"error": f"Unknown tool: {tool_name}"}
         else:
-            result = {"error": f"Unknown tool: {tool_name}"}
+            try:
+                weather_agent = self.registry.get(arguments.get("station_id"))
+            except ValueError as e:
+                result = {"error": str(e)}
+            else:
+                result = await spec.handler(weather_agent, arguments)
 
         return {
             "tool_call_id": f"{tool_name}_response",
@@ -85,6 +206,41 @@ class MCPWeatherServer:
             "result": result,
         }
 
+    async def run_tool_call(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """handle_tool_call with the tool timeout
+
+        A call that times out or raises only produces an error result for itself.
+        """
+        try:
+            async with asyncio.timeout(TOOL_TIMEOUT):
+                return await self.handle_tool_call(tool_name, arguments)
+        except TimeoutError:
+            error = f"Tool {tool_name} timed out after {TOOL_TIMEOUT:g}s"
+        except Exception as e:
+            error = f"Tool {tool_name} failed: {e}"
+        return {
+            "tool_call_id": f"{tool_name}_response",
+            "tool_name": tool_name,
+            "result": {"error": error},
+        }
+
+    async def handle_tool_calls(
+        self, calls: List[Tuple[str, Optional[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Run several tool calls concurrently, at most TOOL_MAX_CONCURRENCY at once
+
+        Results are returned in call order.
+        """
+        if len(calls) == 1:
+            return [await self.run_tool_call(*calls[0])]
+        semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+
+        async def run(tool_name: str, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.run_tool_call(tool_name, arguments)
+
+        return await asyncio.gather(*(run(name, args) for name, args in calls))
+
     def get_tools_definition(self) -> Dict[str, Any]:
         """Return MCP tools definition"""
         return {"version": "1.0", "tools": self.tools}
@@ -0,0 +1,213 @@
+"""MCP JSON-RPC protocol over stdio and HTTP
+
+MCPProtocol answers the MCP lifecycle and tool methods (initialize, ping,
+tools/list, tools/call) for an MCPWeatherServer. It accepts single messages
+and JSON-RPC batches; the messages of a batch run concurrently. Transports:
+
+- HTTP:  POST /mcp on the web app (streamable HTTP, JSON responses)
+- stdio: `weather-llm-mcp` or `python -m weather_llm_demo.mcp_transport`,
+         one JSON-RPC message per line
+
+Both read through the weather cache; with a shared cache backend the stdio
+server reuses the web app's scrapes instead of making its own.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from importlib import metadata
+from typing import Any, Dict, List, Optional, Set, Union
+
+from .mcp_server import TOOL_MAX_CONCURRENCY, MCPWeatherServer
+from .metrics import Counter
+from .tool_payload import is_tool_error, render_tool_result
+
+# Newest first; an unknown client version is answered with the newest
+PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+MCP_MAX_BATCH = int(os.getenv("MCP_MAX_BATCH", "100"))
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+MCP_REQUESTS = Counter("weather_llm_mcp_requests_total", "MCP JSON-RPC messages handled", ["method", "outcome"])
+
+Message = Dict[str, Any]
+
+
+def _server_version() -> str:
+    try:
+        return metadata.version("weather-llm-demo")
+    except metadata.PackageNotFoundError:
+        return "0.0.0"
+
+
+def _error(request_id: Any, code: int, message: str) -> Message:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class MCPProtocol:
+    """JSON-RPC dispatch for the MCP methods this server offers"""
+
+    def __init__(self, server: MCPWeatherServer, max_batch: int = MCP_MAX_BATCH):
+        self.server = server
+        self.max_batch = max_batch
+        self.server_info = {"name": "weather-llm-demo", "version": _server_version()}
+        self._methods = {
+            "initialize": self._initialize,
+            "ping": self._ping,
+            "tools/list": self._tools_list,
+            "tools/call": self._tools_call,
+        }
+
+    async def handle_raw(self, body: Union[bytes, str]) -> Optional[Union[Message, List[Message]]]:
+        """Decode and answer one message or batch; None when nothing needs a reply"""
+        try:
+            payload = json.loads(body)
+        except (ValueError, UnicodeDecodeError) as e:
+            MCP_REQUESTS.inc(method="", outcome="parse_error")
+            return _error(None, PARSE_ERROR, f"Parse error: {e}")
+        return await self.handle(payload)
+
+    async def handle(self, payload: Any) -> Optional[Union[Message, List[Message]]]:
+        """Answer a decoded message, or a batch of them concurrently"""
+        if not isinstance(payload, list):
+            return await self.handle_message(payload)
+        if not payload:
+            return _error(None, INVALID_REQUEST, "Empty batch")
+        if len(payload) > self.max_batch:
+            return _error(None, INVALID_REQUEST, f"Batch too large (limit {self.max_batch})")
+
+        semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+
+        async def run(message: Any) -> Optional[Message]:
+            async with semaphore:
+                return await self.handle_message(message)
+
+        responses = await asyncio.gather(*(run(message) for message in payload))
+        answered = [response for response in responses if response is not None]
+        return answered or None
+
+    async def handle_message(self, message: Any) -> Optional[Message]:
+        """Answer one request; notifications and responses get no reply"""
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0":
+            MCP_REQUESTS.inc(method="", outcome="invalid")
+            return _error(None, INVALID_REQUEST, "Invalid Request")
+        method = message.get("method")
+        if not isinstance(method, str):
+            # A response to a server request, which this server never sends
+            return None
+        is_notification = "id" not in message
+        request_id = message.get("id")
+        handler = self._methods.get(method)
+        if handler is None:
+            if is_notification:
+                # notifications/initialized, notifications/cancelled and the like
+                MCP_REQUESTS.inc(method="notification", outcome="ok")
+                return None
+            MCP_REQUESTS.inc(method="unknown", outcome="error")
+            return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}")
+
+        params = message.get("params") or {}
+        if not isinstance(params, dict):
+            MCP_REQUESTS.inc(method=method, outcome="error")
+            return _error(request_id, INVALID_PARAMS, "params must be an object")
+        try:
+            result = await handler(params)
+        except ValueError as e:
+            MCP_REQUESTS.inc(method=method, outcome="error")
+            return _error(request_id, INVALID_PARAMS, str(e))
+        MCP_REQUESTS.inc(method=method, outcome="ok")
+        if is_notification:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        requested = params.get("protocolVersion")
+        return {
+            "protocolVersion": requested if requested in PROTOCOL_VERSIONS else PROTOCOL_VERSIONS[0],
+            "capabilities": {"tools": {"listChanged": False}},
+            "serverInfo": self.server_info,
+            "instructions": "Weather observations, forecasts and history from Weather Underground stations. "
+            "Every tool takes an optional station_id; omit it for the default station.",
+        }
+
+    async def _ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    async def _tools_list(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {"tools": self.server.mcp_tools}
+
+    async def _tools_call(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params.get("name")
+        if name not in self.server.specs:
+            raise ValueError(f"Unknown tool: {name}")
+        arguments = params.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            raise ValueError("arguments must be an object")
+        result = (await self.server.run_tool_call(name, arguments))["result"]
+        return {
+            "content": [{"type": "text", "text": render_tool_result(name, result)}],
+            "structuredContent": result,
+            "isError": is_tool_error(result),
+        }
+
+
+async def serve_stdio(protocol: MCPProtocol, reader: Any = None, writer: Any = None) -> None:
+    """Serve newline-delimited JSON-RPC until the input closes
+
+    Each line is handled as its own task, so a slow scrape does not hold up
+    other requests; replies are written as they finish.
+    """
+    reader = reader or sys.stdin.buffer
+    writer = writer or sys.stdout.buffer
+    pending: Set[asyncio.Task] = set()
+
+    async def answer(line: bytes) -> None:
+        response = await protocol.handle_raw(line)
+        if response is not None:
+            # One write per reply, with no await in between, keeps lines whole
+            writer.write(json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n")
+            writer.flush()
+
+    while True:
+        line = await asyncio.to_thread(reader.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        task = asyncio.ensure_future(answer(line))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run_stdio(writer: Any = None) -> None:
+    """Build a registry and HTTP pool, then serve MCP on stdin/stdout"""
+    from .http_client import create_http_client
+    from .registry import StationRegistry
+    from .weather_agent import weather_cache
+
+    registry = StationRegistry()
+    client = create_http_client("WEATHER_HTTP", headers=registry.get().headers)
+    registry.client = client
+    try:
+        await serve_stdio(MCPProtocol(MCPWeatherServer(registry)), writer=writer)
+    finally:
+        await client.aclose()
+        if weather_cache.shared is not None:
+            await weather_cache.shared.close()
+
+
+def main() -> None:
+    # stdout carries only protocol messages; warnings printed by the app go to stderr
+    protocol_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    asyncio.run(run_stdio(protocol_out))
+
+
+if __name__ == "__main__":
+    main()
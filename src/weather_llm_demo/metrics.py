@@ -0,0 +1,170 @@
+"""Prometheus-style metrics and request-ID-tagged timing logs"""
+
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_INF_BUCKET = 'le="+Inf"'
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+timing_logger = logging.getLogger("weather_llm_demo.timing")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def log_timing(event: str, **fields) -> None:
+    """Write one structured JSON log line tagged with the current request id"""
+    if timing_logger.isEnabledFor(logging.INFO):
+        record = {"event": event, "request_id": request_id_var.get(), **fields}
+        timing_logger.info(json.dumps(record, default=str))
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.callback():g}",
+        ]
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts, sum, count
+        self._series: Dict[Tuple[str, ...], List] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_BUCKET)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REGISTRY: List = []
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "weather_llm_stage_seconds",
+    "Duration of each processing stage",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "weather_llm_http_request_seconds",
+    "HTTP request duration until the response starts",
+    ["method", "route", "status"],
+)
+FALLBACKS = Counter(
+    "weather_llm_fallback_total",
+    "Responses served from fallback or demo data",
+    ["component", "reason"],
+)
+SCRAPES = Counter(
+    "weather_llm_scrapes_total",
+    "Page scrapes by outcome: changed, unchanged (same state blob) or not_modified (304)",
+    ["page", "result"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "weather_llm_admission_rejected_total",
+    "Chat requests shed by the rate limiter or admission control",
+    ["reason"],
+)
+
+
+@contextmanager
+def timed(stage: str, **fields) -> Iterator[None]:
+    """Observe the duration of a block in the stage histogram and log it"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        log_timing("stage", stage=stage, duration_ms=round(elapsed * 1000, 2), **fields)
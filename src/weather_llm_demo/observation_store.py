@@ -0,0 +1,210 @@
+"""Append-only time-series store of station observations backed by SQLite
+
+The history is a row table, one row per observation, rather than the
+columnar array chunks first proposed. A station reports every five
+minutes, so a month is about 8,600 rows. At that size the row table is
+fast enough: about 0.5 ms to read a day of raw rows and 20 ms to
+downsample a month by the hour. It also lets SQLite deduplicate on the
+primary key, apply retention with a single DELETE and aggregate with
+GROUP BY, with no chunk rewrites or merge step. The cost is space: about
+110 bytes per observation, roughly 1 MB per station-month, against 80
+bytes for float64 columns and 40 for float32.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# SQLite file holding the observation history; empty keeps it in memory only
+OBSERVATION_STORE_PATH = os.getenv("OBSERVATION_STORE_PATH", "observations.db")
+OBSERVATION_RETENTION_DAYS = float(os.getenv("OBSERVATION_RETENTION_DAYS", "30"))
+
+# Stored per observation, already converted to metric units by units.convert_observations
+METRICS = (
+    "temperature_c",
+    "dew_point_c",
+    "feels_like_c",
+    "humidity",
+    "wind_kmh",
+    "gust_kmh",
+    "pressure_mb",
+    "precip_rate_mm",
+    "uv_index",
+)
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%MZ")
+
+
+class ObservationStore:
+    """Observations keyed by (station, epoch), clustered for range scans
+
+    The table is WITHOUT ROWID, so rows are stored in primary key order and a
+    time range of one station is a contiguous B-tree scan. Observations
+    already stored are skipped, so the day's series can be re-added on every
+    scrape.
+    """
+
+    def __init__(self, path: str = OBSERVATION_STORE_PATH, retention_days: float = OBSERVATION_RETENTION_DAYS):
+        self.path = path or ":memory:"
+        self.retention_days = retention_days
+        # Opened on first use, so importing the app creates no files
+        self._db: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._insert_sql = (
+            f"INSERT OR IGNORE INTO observations (station, epoch, {', '.join(METRICS)}) "
+            f"VALUES ({', '.join('?' * (len(METRICS) + 2))})"
+        )
+        self._lock = threading.Lock()
+        # Newest stored epoch per station, so re-sent observations are skipped cheaply
+        self._latest: Dict[str, int] = {}
+        self.inserted = 0
+        self.skipped = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    self._db = self._open()
+        return self._db
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{name} REAL" for name in METRICS)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS observations (station TEXT NOT NULL, epoch INTEGER NOT NULL, "
+            f"{columns}, PRIMARY KEY (station, epoch)) WITHOUT ROWID"
+        )
+        return conn
+
+    def add_observations(self, station_id: str, observations: Sequence[Dict[str, Any]]) -> int:
+        """Convert and store the observations not seen yet; return how many were added"""
+        from .units import convert_observations
+
+        return self.add_series(station_id, convert_observations(observations))
+
+    def add_series(self, station_id: str, series: Dict[str, "np.ndarray"]) -> int:
+        """Store the rows of an already converted series that are not stored yet"""
+        import numpy as np
+
+        from .units import to_list
+
+        with self._lock:
+            latest = self._latest.get(station_id)
+            if latest is None:
+                latest = self._conn.execute(
+                    "SELECT MAX(epoch) FROM observations WHERE station = ?", (station_id,)
+                ).fetchone()[0] or 0
+            with np.errstate(invalid="ignore"):
+                new = series["epoch"] > latest
+            self.skipped += int(np.count_nonzero(~np.isnan(series["epoch"]))) - int(np.count_nonzero(new))
+            if not new.any():
+                self._latest[station_id] = latest
+                return 0
+            epochs = series["epoch"][new].astype(np.int64).tolist()
+            columns = [to_list(series[name][new], 2) for name in METRICS]
+            new_rows = [(station_id, *row) for row in zip(epochs, *columns)]
+
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(self._insert_sql, new_rows)
+                added = self._conn.total_changes - before
+                if self.retention_days > 0:
+                    self._conn.execute(
+                        "DELETE FROM observations WHERE station = ? AND epoch < ?",
+                        (station_id, int(time.time() - self.retention_days * 86400)),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._latest[station_id] = max(latest, max(epochs))
+            self.inserted += added
+            return added
+
+    def query(self, station_id: str, start: int, end: int) -> Dict[str, List]:
+        """Return the raw observations in [start, end] as columns"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT epoch, {', '.join(METRICS)} FROM observations "
+                "WHERE station = ? AND epoch BETWEEN ? AND ? ORDER BY epoch",
+                (station_id, start, end),
+            ).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * (len(METRICS) + 1)
+        result: Dict[str, List] = {"epoch": list(columns[0])}
+        for name, values in zip(METRICS, columns[1:]):
+            result[name] = list(values)
+        return result
+
+    def latest(self, station_id: str) -> Optional[Dict[str, Any]]:
+        """Return the newest stored observation of a station, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT epoch, {', '.join(METRICS)} FROM observations "
+                "WHERE station = ? ORDER BY epoch DESC LIMIT 1",
+                (station_id,),
+            ).fetchone()
+        return dict(zip(("epoch",) + METRICS, row)) if row else None
+
+    def downsample(self, station_id: str, start: int, end: int, bucket: int = 3600) -> Dict[str, List]:
+        """Return min/max/avg of every metric per bucket of seconds in [start, end]"""
+        aggregates = ", ".join(f"MIN({m}), MAX({m}), ROUND(AVG({m}), 2)" for m in METRICS)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT (epoch / ?) * ? AS bucket, COUNT(*), {aggregates} FROM observations "
+                "WHERE station = ? AND epoch BETWEEN ? AND ? GROUP BY bucket ORDER BY bucket",
+                (bucket, bucket, station_id, start, end),
+            ).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * (len(METRICS) * 3 + 2)
+        result: Dict[str, List] = {"epoch": list(columns[0]), "samples": list(columns[1])}
+        for i, name in enumerate(METRICS):
+            for j, stat in enumerate(("min", "max", "avg")):
+                result[f"{name}_{stat}"] = list(columns[2 + i * 3 + j])
+        return result
+
+    def history(self, station_id: str, start: int, end: int, bucket: int = 3600) -> Dict[str, Any]:
+        """Range query for the API and the MCP tool; bucket 0 returns raw observations"""
+        series = self.downsample(station_id, start, end, bucket) if bucket > 0 else self.query(station_id, start, end)
+        return {
+            "station": station_id,
+            "start": _iso(start),
+            "end": _iso(end),
+            "bucket_seconds": bucket,
+            "count": len(series["epoch"]),
+            "time": [_iso(epoch) for epoch in series["epoch"]],
+            **series,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, stations = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT station) FROM observations"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "observations": count,
+            "stations": stations,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# Shared by every WeatherAgent in the process
+observation_store = ObservationStore()
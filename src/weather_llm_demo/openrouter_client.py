@@ -1,15 +1,46 @@
 import httpx
-from typing import Dict, Any, List, Optional
+import json
+from typing import Dict, Any, AsyncIterator, List, Optional
+from .http_client import create_http_client
+from .completion_cache import CompletionCache, completion_key
+from .metrics import FALLBACKS
+from .resilience import CircuitBreaker, Upstream, UpstreamUnavailable, openrouter_upstream
+
+# Models that only cache prompt blocks tagged with cache_control; OpenAI-style
+# providers cache a stable prompt prefix on their own
+PROMPT_CACHE_HINT_MODELS = ("anthropic/", "google/gemini")
 
 
 class OpenRouterClient:
     """Client for OpenRouter API with Italian weather responses"""
 
-    def __init__(self, api_key_file: str = ".openrouter_api_key"):
+    def __init__(
+        self,
+        api_key_file: str = ".openrouter_api_key",
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[CompletionCache] = None,
+        upstream: Optional[Upstream] = None,
+    ):
         self.api_key = self._load_api_key(api_key_file)
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.client = client
+        self.cache = cache if cache is not None else CompletionCache()
+        self.upstream = upstream if upstream is not None else openrouter_upstream
         import os
+        self.base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
         self.model = os.getenv("TOOL_CALLING_OPENROUTER_LLM_MODEL", "openai/gpt-3.5-turbo")  # Configurable model with fallback
+        # auto: tag the system prompt for providers that need explicit caching hints
+        self.prompt_cache = os.getenv("OPENROUTER_PROMPT_CACHE", "auto").lower()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating a private pooled one if none was attached"""
+        if self.client is None or self.client.is_closed:
+            self.client = create_http_client("OPENROUTER_HTTP", read_timeout=30.0)
+        return self.client
+
+    async def aclose(self) -> None:
+        """Close the HTTP client used by this client"""
+        if self.client is not None:
+            await self.client.aclose()
 
     def _load_api_key(self, api_key_file: str) -> str:
         """Load API key from file"""
@@ -24,22 +55,187 @@ class OpenRouterClient:
         self,
         messages: List[Dict[str, str]],
         tools: Optional[List[Dict]] = None,
+        cache_context: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Create completion with weather context"""
+        """Create completion with weather context
+
+        cache_context is a digest of any outside state the answer depends on
+        (such as the weather snapshot); it is part of the completion cache key.
+        """
 
         if self.api_key == "demo_key":
+            FALLBACKS.inc(component="openrouter", reason="demo_mode")
             return self._create_demo_response(messages)
 
-        headers = {
+        cache_key = self._cache_key(messages, tools, cache_context)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        headers = self._headers()
+        payload = self._payload(messages, tools)
+
+        async def post() -> Dict[str, Any]:
+            response = await self._get_client().post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+            )
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            completion = await self.upstream.call(post, hedge=True)
+        except Exception as e:
+            return self._degraded(cache_key, e)
+
+        if cache_key is not None and completion.get("choices"):
+            self.cache.set(cache_key, completion)
+        return completion
+
+    async def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict]] = None,
+        cache_context: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a completion as it is generated
+
+        Yields {"type": "token", "content": ...} for each content delta, then a
+        final {"type": "message", "message": ...} with the assembled assistant
+        message, including any tool calls. Cached completions are replayed as
+        a single token.
+        """
+        if self.api_key == "demo_key":
+            FALLBACKS.inc(component="openrouter", reason="demo_mode")
+            async for event in self._stream_demo_response(messages):
+                yield event
+            return
+
+        cache_key = self._cache_key(messages, tools, cache_context)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                message = cached["choices"][0]["message"]
+                if message.get("content"):
+                    yield {"type": "token", "content": message["content"]}
+                yield {"type": "message", "message": message}
+                return
+
+        payload = self._payload(messages, tools)
+        payload["stream"] = True
+
+        async def open_stream() -> httpx.Response:
+            client = self._get_client()
+            request = client.build_request(
+                "POST", f"{self.base_url}/chat/completions", headers=self._headers(), json=payload
+            )
+            response = await client.send(request, stream=True)
+            if response.status_code != 200:
+                await response.aread()
+                await response.aclose()
+                response.raise_for_status()
+            return response
+
+        try:
+            response = await self.upstream.call(open_stream)
+        except Exception as e:
+            completion = self._degraded(cache_key, e)
+            message = completion["choices"][0]["message"]
+            if message.get("content"):
+                yield {"type": "token", "content": message["content"]}
+            yield {"type": "message", "message": message, "stale": True}
+            return
+
+        content = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        # Only a stream that ended with [DONE] or a finish_reason is complete
+        finished = False
+        try:
+            async for line in response.aiter_lines():
+                # Skip blank separators and SSE comments such as keep-alives
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    finished = True
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                finished = finished or bool(choices[0].get("finish_reason"))
+                delta = choices[0].get("delta") or {}
+
+                if delta.get("content"):
+                    content.append(delta["content"])
+                    yield {"type": "token", "content": delta["content"]}
+
+                for call_delta in delta.get("tool_calls") or []:
+                    call = tool_calls.setdefault(
+                        call_delta.get("index", len(tool_calls)),
+                        {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+                    )
+                    if call_delta.get("id"):
+                        call["id"] = call_delta["id"]
+                    function = call_delta.get("function") or {}
+                    call["function"]["name"] += function.get("name") or ""
+                    call["function"]["arguments"] += function.get("arguments") or ""
+        except Exception:
+            self.upstream.record_stream_failure("stream_error")
+            raise
+        finally:
+            await response.aclose()
+
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        if not finished:
+            # Closed early: pass on what arrived, but never replay it as a whole answer
+            self.upstream.record_stream_failure("stream_truncated")
+        elif cache_key is not None:
+            self.cache.set(cache_key, {"choices": [{"message": message}]})
+        yield {"type": "message", "message": message}
+
+    def _degraded(self, cache_key: Optional[str], error: Exception) -> Dict[str, Any]:
+        """Return the last cached completion for this request marked stale, or raise
+
+        Raises UpstreamUnavailable when nothing was ever cached for the request,
+        rather than answering with made-up text.
+        """
+        stale = self.cache.get_stale(cache_key) if cache_key is not None else None
+        if stale is not None:
+            FALLBACKS.inc(component="openrouter", reason="stale_completion")
+            stale["stale"] = True
+            return stale
+        FALLBACKS.inc(component="openrouter", reason="unavailable")
+        if isinstance(error, UpstreamUnavailable):
+            raise error
+        retry_after = self.upstream.breaker.reset_timeout if self.upstream.breaker.state != CircuitBreaker.CLOSED else 5.0
+        raise UpstreamUnavailable("openrouter", str(error) or type(error).__name__, retry_after) from error
+
+    def _cache_key(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict]],
+        cache_context: Optional[str],
+    ) -> Optional[str]:
+        if not self.cache.enabled:
+            return None
+        return completion_key(messages, self.model, tools, cache_context)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost:8000",
             "X-Title": "Weather LLM Demo",
         }
 
+    def _payload(
+        self, messages: List[Dict[str, str]], tools: Optional[List[Dict]] = None
+    ) -> Dict[str, Any]:
         payload = {
             "model": self.model,
-            "messages": messages,
+            "messages": self._with_cache_hints(messages),
             "temperature": 0.7,
             "max_tokens": 1024,
         }
@@ -48,24 +244,29 @@ class OpenRouterClient:
         if tools is not None:
             payload["tools"] = tools
             payload["tool_choice"] = "auto"
+        return payload
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0,
-                )
-
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return self._create_demo_response(messages)
+    def _with_cache_hints(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mark the static system prompt as cacheable where the provider needs a hint"""
+        if self.prompt_cache in ("false", "0", "no"):
+            return messages
+        if self.prompt_cache == "auto" and not self.model.startswith(PROMPT_CACHE_HINT_MODELS):
+            return messages
+        if not messages or messages[0].get("role") != "system" or not isinstance(messages[0].get("content"), str):
+            return messages
+        system = {
+            "role": "system",
+            "content": [{"type": "text", "text": messages[0]["content"], "cache_control": {"type": "ephemeral"}}],
+        }
+        return [system] + messages[1:]
 
-        except Exception as e:
-            print(f"Using demo mode due to: {e}")
-            return self._create_demo_response(messages)
+    async def _stream_demo_response(
+        self, messages: List[Dict]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the demo response as a single token"""
+        message = self._create_demo_response(messages)["choices"][0]["message"]
+        yield {"type": "token", "content": message["content"]}
+        yield {"type": "message", "message": message}
 
     def _create_demo_response(
         self, messages: List[Dict]
@@ -0,0 +1,107 @@
+"""Background weather poller that pushes snapshot changes to subscribers"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Set
+
+from .weather_agent import WeatherAgent
+
+POLL_INTERVAL = float(os.getenv("WEATHER_POLL_INTERVAL", "60"))
+
+# Fields that change on every fetch without the weather itself changing
+VOLATILE_KEYS = {"timestamp"}
+
+
+def snapshot_digest(data: Any) -> str:
+    """Return a stable digest of a weather snapshot, ignoring volatile fields"""
+
+    def strip(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    encoded = json.dumps(strip(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class WeatherPoller:
+    """Poll the station on a schedule and keep the latest snapshot in memory"""
+
+    def __init__(self, weather_agent: WeatherAgent, interval: float = POLL_INTERVAL):
+        self.weather_agent = weather_agent
+        self.interval = interval
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.digest: Optional[str] = None
+        # Epoch of the newest observation pushed to subscribers
+        self.observation_epoch: Optional[int] = None
+        self.version = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start polling in the background"""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and wait for the task to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️  Weather poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> bool:
+        """Fetch a snapshot and notify subscribers when the station reported a new observation
+
+        Any other change (a forecast update, the station becoming unavailable)
+        replaces the snapshot quietly, unless there is no observation time to
+        compare. Returns True when subscribers were notified.
+        """
+        data = await self.weather_agent.get_all_weather_data()
+        digest = snapshot_digest(data)
+        if digest == self.digest:
+            return False
+
+        self.snapshot = data
+        self.digest = digest
+        observation_epoch = (data.get("current") or {}).get("observation_epoch")
+        if observation_epoch is not None and self.observation_epoch is not None:
+            if observation_epoch <= self.observation_epoch:
+                return False
+        if observation_epoch is not None:
+            self.observation_epoch = observation_epoch
+        self.version += 1
+        for queue in self._subscribers:
+            # Subscribers only need the latest snapshot; drop one they have not read yet
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+        return True
+
+    def subscribe(self) -> asyncio.Queue:
+        """Return a queue that receives every changed snapshot"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
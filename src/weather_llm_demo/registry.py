@@ -0,0 +1,126 @@
+"""Registry of per-station weather agents sharing one connection pool and cache"""
+
+import asyncio
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .weather_agent import WeatherAgent, WeatherCache, weather_cache
+
+# Extra stations as "ID=Location" entries separated by semicolons,
+# e.g. "IROME8278=Rome, Italy;IMILAN123=Milan, Italy"
+STATIONS = os.getenv("STATIONS", "")
+# Whether stations that are not configured may be requested by id
+ALLOW_UNLISTED_STATIONS = os.getenv("ALLOW_UNLISTED_STATIONS", "false").lower() in ("1", "true", "yes")
+MAX_STATIONS = int(os.getenv("MAX_STATIONS", "100"))
+# Global cap on concurrent station fetches across all bulk requests
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "8"))
+
+STATION_ID_PATTERN = re.compile(r"^[A-Za-z0-9]{3,32}$")
+
+
+def parse_stations(value: str) -> Dict[str, Optional[str]]:
+    """Parse the STATIONS setting into a station id -> location mapping"""
+    stations: Dict[str, Optional[str]] = {}
+    for entry in value.split(";"):
+        station_id, _, location = entry.partition("=")
+        station_id = station_id.strip()
+        if station_id:
+            stations[station_id] = location.strip() or None
+    return stations
+
+
+class StationRegistry:
+    """Create and hold one WeatherAgent per station"""
+
+    def __init__(
+        self,
+        default_station_id: Optional[str] = None,
+        stations: Optional[Dict[str, Optional[str]]] = None,
+        allow_unlisted: bool = ALLOW_UNLISTED_STATIONS,
+        max_stations: int = MAX_STATIONS,
+        cache: Optional[WeatherCache] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        default_station_id = default_station_id or os.getenv("STATION_ID")
+        if not default_station_id:
+            raise ValueError("STATION_ID not set in environment variables")
+        self.default_station_id = default_station_id
+        self.stations = {default_station_id: os.getenv("LOCATION")}
+        self.stations.update(parse_stations(STATIONS) if stations is None else stations)
+        self.allow_unlisted = allow_unlisted
+        self.max_stations = max_stations
+        self.cache = cache if cache is not None else weather_cache
+        self._client = client
+        self._agents: Dict[str, WeatherAgent] = {}
+        self._bulk_semaphore = asyncio.Semaphore(BULK_MAX_CONCURRENCY)
+
+    @property
+    def client(self) -> Optional[httpx.AsyncClient]:
+        return self._client
+
+    @client.setter
+    def client(self, client: Optional[httpx.AsyncClient]) -> None:
+        """Attach a shared HTTP client to every current and future agent"""
+        self._client = client
+        for agent in self._agents.values():
+            agent.client = client
+
+    def get(self, station_id: Optional[str] = None) -> WeatherAgent:
+        """Return the agent for a station, or for the default station
+
+        Raises ValueError for unknown or invalid station ids.
+        """
+        station_id = station_id or self.default_station_id
+        agent = self._agents.get(station_id)
+        if agent is not None:
+            return agent
+
+        if station_id not in self.stations:
+            if not self.allow_unlisted:
+                raise ValueError(f"Unknown station: {station_id}")
+            if not STATION_ID_PATTERN.match(station_id):
+                raise ValueError(f"Invalid station id: {station_id}")
+        if len(self._agents) >= self.max_stations:
+            raise ValueError(f"Too many stations (limit {self.max_stations})")
+
+        agent = WeatherAgent(
+            station_id=station_id,
+            location=self.stations.get(station_id),
+            cache=self.cache,
+            client=self._client,
+        )
+        self._agents[station_id] = agent
+        return agent
+
+    def list_stations(self) -> List[Dict[str, Any]]:
+        """Return the configured stations"""
+        return [
+            {"station_id": station_id, "location": location, "default": station_id == self.default_station_id}
+            for station_id, location in self.stations.items()
+        ]
+
+    async def get_many(self, station_ids: List[str], kind: str = "all") -> Dict[str, Dict[str, Any]]:
+        """Fetch many stations concurrently under the global bulk concurrency cap
+
+        kind is "current", "forecast" or "all". An unknown station yields an
+        error entry instead of failing the whole request.
+        """
+
+        async def fetch(station_id: str) -> Dict[str, Any]:
+            try:
+                agent = self.get(station_id)
+            except ValueError as e:
+                return {"error": str(e)}
+            async with self._bulk_semaphore:
+                if kind == "current":
+                    return await agent.get_current_conditions()
+                if kind == "forecast":
+                    return await agent.get_forecast()
+                return await agent.get_all_weather_data()
+
+        unique_ids = list(dict.fromkeys(station_ids))
+        results = await asyncio.gather(*(fetch(station_id) for station_id in unique_ids))
+        return dict(zip(unique_ids, results))
@@ -0,0 +1,248 @@
+"""Retry with backoff, request hedging and a circuit breaker for upstream calls
+
+Each upstream (Weather Underground, OpenRouter) gets one Upstream, configured
+from environment variables with the same prefix as its HTTP pool
+(WEATHER_HTTP_*, OPENROUTER_HTTP_*).
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from .metrics import Counter, Gauge, timed
+
+T = TypeVar("T")
+
+# Statuses worth retrying: rate limited, or a server-side problem
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+RETRIES = Counter("weather_llm_upstream_retries_total", "Upstream calls retried", ["upstream"])
+HEDGES = Counter("weather_llm_upstream_hedges_total", "Hedged upstream requests sent", ["upstream"])
+FAILURES = Counter("weather_llm_upstream_failures_total", "Upstream calls failed after retries", ["upstream", "reason"])
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream failed and there is no last known-good data to serve instead"""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 5.0):
+        super().__init__(f"{upstream} is unavailable: {reason}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The upstream's breaker is open; the call was not attempted"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(upstream, f"circuit open, retry in {retry_after:.0f}s", retry_after)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transport errors, timeouts and retryable HTTP statuses; never other 4xx"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if any"""
+    if isinstance(error, httpx.HTTPStatusError):
+        value = error.response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+    return None
+
+
+class CircuitBreaker:
+    """Open after consecutive failures, then let one probe through after a cool-down"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        if not self.enabled or self.state == self.CLOSED:
+            return
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = self.CLOSED
+        self._probing = False
+
+    def cancel_probe(self) -> None:
+        """Let another call probe when a half-open probe was cancelled"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.enabled and (self.state == self.HALF_OPEN or self.failures >= self.failure_threshold):
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "opens": self.opens}
+
+
+class LatencyWindow:
+    """Recent successful call durations, for the hedging threshold"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _env(prefix: str, name: str, default: str) -> str:
+    return os.getenv(f"{prefix}_{name}", default)
+
+
+class Upstream:
+    """Retry, optional hedging and a circuit breaker around calls to one upstream"""
+
+    def __init__(self, name: str, prefix: str):
+        self.name = name
+        self.retries = int(_env(prefix, "RETRIES", "2"))
+        self.backoff_base = float(_env(prefix, "BACKOFF_BASE", "0.25"))
+        self.backoff_max = float(_env(prefix, "BACKOFF_MAX", "4"))
+        # Hedge a request still running after this percentile of recent latencies (0 disables)
+        self.hedge_percentile = float(_env(prefix, "HEDGE_PERCENTILE", "0"))
+        self.hedge_min_samples = int(_env(prefix, "HEDGE_MIN_SAMPLES", "20"))
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=int(_env(prefix, "BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(_env(prefix, "BREAKER_RESET", "30")),
+        )
+        self.latency = LatencyWindow()
+        Gauge(
+            f"weather_llm_upstream_circuit_open_{name}",
+            f"1 while the {name} circuit breaker is open",
+            lambda: 0 if self.breaker.state == CircuitBreaker.CLOSED else 1,
+        )
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Exponential backoff with full jitter, honouring Retry-After up to backoff_max"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        requested = _retry_after(error)
+        if requested is not None:
+            delay = max(delay, min(requested, self.backoff_max))
+        return delay
+
+    async def call(
+        self, fn: Callable[[], Awaitable[T]], hedge: bool = False, stage: Optional[str] = None, **fields: Any
+    ) -> T:
+        """Run fn through the breaker, retrying retryable failures
+
+        fn must raise for failed responses (e.g. response.raise_for_status()).
+        With a stage, each attempt is timed under it, without the backoff sleeps.
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            start = time.monotonic()
+            try:
+                with timed(stage, attempt=attempt, **fields) if stage else nullcontext():
+                    result = await (self._hedged(fn) if hedge else fn())
+            except asyncio.CancelledError:
+                self.breaker.cancel_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; a bad request is not an outage
+                    self.breaker.record_success()
+                    FAILURES.inc(upstream=self.name, reason="rejected")
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.retries:
+                    FAILURES.inc(upstream=self.name, reason="exhausted")
+                    raise
+                RETRIES.inc(upstream=self.name)
+                await asyncio.sleep(self.backoff(attempt, e))
+                attempt += 1
+                continue
+            self.latency.add(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    def record_stream_failure(self, reason: str) -> None:
+        """Count a response that failed after it started, such as a stream cut short"""
+        self.breaker.record_failure()
+        FAILURES.inc(upstream=self.name, reason=reason)
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Send a second request if the first is slower than the latency percentile
+
+        The first successful response wins and the other request is cancelled.
+        """
+        if self.hedge_percentile <= 0 or len(self.latency) < self.hedge_min_samples:
+            return await fn()
+
+        delay = self.latency.percentile(self.hedge_percentile)
+        tasks = {asyncio.ensure_future(fn())}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                HEDGES.inc(upstream=self.name)
+                tasks.add(asyncio.ensure_future(fn()))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "hedge_percentile": self.hedge_percentile,
+            "latency_samples": len(self.latency),
+            "breaker": self.breaker.stats(),
+        }
+
+
+# One per upstream host, shared by every agent and client in the process
+weather_upstream = Upstream("weather", "WEATHER_HTTP")
+openrouter_upstream = Upstream("openrouter", "OPENROUTER_HTTP")
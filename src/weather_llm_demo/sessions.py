@@ -0,0 +1,251 @@
+"""Server-side chat sessions with bounded, token-aware conversation history
+
+Each session keeps its turns (user message, any tool calls and results, and
+the answer) in memory. Sessions are evicted least recently used first and
+after sitting idle; within a session the oldest turns are dropped once the
+history exceeds its turn limit or token budget, leaving a one-line summary
+of what the user asked. A tool result identical to one already in the
+history is sent as a short reference to it instead of being repeated.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+# Seconds a session may sit unused before it is forgotten
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+# Estimated tokens of history (without the system prompt) resent with each turn
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "4000"))
+
+# Rough estimate that avoids a tokenizer dependency; good enough for budgeting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+# Earlier questions kept in the summary of dropped turns, and their length
+SUMMARY_QUESTIONS = 5
+SUMMARY_QUESTION_CHARS = 120
+
+Message = Dict[str, Any]
+
+
+def estimate_tokens(message: Message) -> int:
+    """Approximate prompt tokens of one chat message"""
+    content = message.get("content") or ""
+    size = len(content) if isinstance(content, str) else len(json.dumps(content))
+    for call in message.get("tool_calls") or []:
+        size += len(call["function"]["name"]) + len(call["function"].get("arguments") or "")
+    return size // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class Session:
+    """One conversation: its turns, a summary of dropped turns and sent tool results"""
+
+    def __init__(self, session_id: str, max_turns: int = SESSION_MAX_TURNS, token_budget: int = SESSION_TOKEN_BUDGET):
+        self.id = session_id
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.turns: List[List[Message]] = []
+        self.summary: List[str] = []
+        # Turns of one session run one at a time so the history stays in order
+        self.lock = asyncio.Lock()
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.tokens = 0
+        self.dropped_turns = 0
+        self.deduplicated = 0
+        # Digest of each tool result in the rendered history -> name of the tool
+        self._tool_results: Dict[str, str] = {}
+        # Full content of this turn's tool results that were sent as references
+        self._full_results: Dict[str, str] = {}
+
+    def messages(self, system_prompt: str, user_message: str) -> List[Message]:
+        """The prompt for a new turn: system prompt, summary, history and the new message
+
+        The system prompt stays first and unchanged so providers can cache it.
+        """
+        messages: List[Message] = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append(
+                {"role": "system", "content": "Earlier in this conversation the user asked: " + "; ".join(self.summary)}
+            )
+        for turn in self._render():
+            messages.extend(turn)
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def _render(self) -> List[List[Message]]:
+        """The history as sent: repeated tool results become references to the first one
+
+        Turns are stored in full, so trimming never leaves a reference whose
+        original is gone.
+        """
+        self._tool_results = {}
+        rendered = []
+        for turn in self.turns:
+            messages = []
+            for message in turn:
+                if message.get("role") == "tool":
+                    message = dict(message, content=self._reference(message.get("name") or "tool", message["content"]))
+                messages.append(message)
+            rendered.append(messages)
+        return rendered
+
+    def _reference(self, tool_name: str, content: str) -> str:
+        digest = _digest(content)
+        earlier = self._tool_results.get(digest)
+        if earlier is None:
+            self._tool_results[digest] = tool_name
+            return content
+        return f"unchanged: same data as the earlier {earlier} result in this conversation"
+
+    def has_tool_result(self, content: str) -> bool:
+        """Whether a tool result with this exact content is already in the history"""
+        return _digest(content) in self._tool_results
+
+    def tool_message(self, tool_call_id: str, tool_name: str, content: str) -> Message:
+        """The tool result message for this turn, referring back to an identical earlier result"""
+        message = {"role": "tool", "tool_call_id": tool_call_id, "name": tool_name, "content": content}
+        sent = self._reference(tool_name, content)
+        if sent is content:
+            return message
+        self.deduplicated += 1
+        # The full result is recorded with the turn; only the prompt carries the reference
+        self._full_results[tool_call_id] = content
+        return dict(message, content=sent)
+
+    def record(self, turn: List[Message]) -> None:
+        """Append a finished turn, then trim the history to the limits"""
+        turn = [
+            dict(message, content=self._full_results[message["tool_call_id"]])
+            if message.get("role") == "tool" and message.get("tool_call_id") in self._full_results
+            else message
+            for message in turn
+        ]
+        self._full_results = {}
+        self.turns.append(turn)
+        self._trim()
+
+    def _trim(self) -> None:
+        """Drop the oldest whole turns; the latest turn is always kept"""
+        while True:
+            rendered = self._render()
+            self.tokens = sum(estimate_tokens(message) for turn in rendered for message in turn)
+            if len(self.turns) <= 1 or (len(self.turns) <= self.max_turns and self.tokens <= self.token_budget):
+                return
+            dropped = self.turns.pop(0)
+            self.dropped_turns += 1
+            question = dropped[0].get("content") or ""
+            if len(question) > SUMMARY_QUESTION_CHARS:
+                question = question[: SUMMARY_QUESTION_CHARS - 1] + "…"
+            self.summary = (self.summary + [question])[-SUMMARY_QUESTIONS:]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "turns": len(self.turns),
+            "history_tokens": self.tokens,
+            "dropped_turns": self.dropped_turns,
+            "deduplicated_tool_results": self.deduplicated,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+class SessionStore:
+    """Sessions by id, least recently used evicted first, idle ones expired"""
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_turns: int = SESSION_MAX_TURNS,
+        token_budget: int = SESSION_TOKEN_BUDGET,
+    ):
+        self.max_sessions = max(max_sessions, 1)
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        """Return the session for this id, or a new one if it is unknown, expired or missing
+
+        New sessions always get a server-generated id, never the one the client
+        sent, so a client cannot pick or guess its way into another session.
+        """
+        self._expire()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session = Session(secrets.token_urlsafe(12), self.max_turns, self.token_budget)
+            self._sessions[session.id] = session
+            self.created += 1
+            self._evict(keep=session)
+        self._sessions.move_to_end(session.id)
+        session.last_used = time.monotonic()
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Look up a session without touching its position or idle time"""
+        return self._sessions.get(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, keep: Session) -> None:
+        """Drop the least recently used sessions over max_sessions
+
+        Sessions with a turn in flight are skipped, so the store may briefly
+        hold more than max_sessions.
+        """
+        excess = len(self._sessions) - self.max_sessions
+        if excess <= 0:
+            return
+        victims = []
+        for session in self._sessions.values():
+            if len(victims) == excess:
+                break
+            if session is not keep and not session.lock.locked():
+                victims.append(session.id)
+        for session_id in victims:
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    def _expire(self) -> None:
+        """Forget sessions idle for longer than idle_ttl; the oldest are at the front"""
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff or session.lock.locked():
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_turns": self.max_turns,
+            "token_budget": self.token_budget,
+            "created": self.created,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "history_tokens": sum(session.tokens for session in self._sessions.values()),
+        }
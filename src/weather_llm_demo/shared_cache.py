@@ -0,0 +1,215 @@
+"""Cache backends shared by every worker process, with refresh leases
+
+WeatherCache keeps its in-process entries; on a local miss it reads the
+shared snapshot, and only the worker holding a station's lease scrapes it
+while the others read the shared copy. Backends:
+
+- memory: no shared layer, each process caches on its own (single worker)
+- file:   one file per key in a directory every worker can reach
+- redis:  any Redis-compatible server (needs `uv sync --extra redis`)
+"""
+
+import asyncio
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+# memory, file or redis; gunicorn.conf.py defaults it to file
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "memory")
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "weather-llm-demo-cache"
+)
+SHARED_CACHE_REDIS_URL = os.getenv("SHARED_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# How long a worker may hold a station's refresh lease before others may take over
+SHARED_CACHE_LEASE_TTL = float(os.getenv("SHARED_CACHE_LEASE_TTL", "20"))
+# While another worker holds the lease, its stale copy is served this long before the shared cache is asked again
+SHARED_CACHE_RECHECK = float(os.getenv("SHARED_CACHE_RECHECK", "2"))
+
+
+def _encode(value: Any, fetched_at: float) -> bytes:
+    return json.dumps({"fetched_at": fetched_at, "value": value}, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(raw: Optional[bytes]) -> Optional[Tuple[Any, float]]:
+    if raw is None:
+        return None
+    record = json.loads(raw)
+    return record["value"], record["fetched_at"]
+
+
+class SharedBackend(ABC):
+    """Shared key/value store with expiring values and leases"""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, fetched_at wall-clock time) or None"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, fetched_at: float, ttl: float) -> None:
+        """Store the value for ttl seconds"""
+
+    @abstractmethod
+    async def acquire_lease(self, key: str, ttl: float = SHARED_CACHE_LEASE_TTL) -> Optional[str]:
+        """Return a token if this process now holds the lease, else None"""
+
+    @abstractmethod
+    async def release_lease(self, key: str, token: str) -> None:
+        """Drop the lease if the token still holds it"""
+
+    async def close(self) -> None:
+        pass
+
+
+class FileBackend(SharedBackend):
+    """One file per key; atomic replace for values, leases under a file lock
+
+    The file operations run in a worker thread, so a slow disk does not stall
+    the event loop.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str = SHARED_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / (key.replace("/", "_").replace(":", "__") + suffix)
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, fetched_at: float, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, fetched_at, ttl)
+
+    async def acquire_lease(self, key: str, ttl: float = SHARED_CACHE_LEASE_TTL) -> Optional[str]:
+        return await asyncio.to_thread(self._acquire_lease, key, ttl)
+
+    async def release_lease(self, key: str, token: str) -> None:
+        await asyncio.to_thread(self._release_lease, key, token)
+
+    def _get(self, key: str) -> Optional[Tuple[Any, float]]:
+        path = self._path(key, ".json")
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        expires, _, payload = raw.partition(b"\n")
+        if float(expires) < time.time():
+            return None
+        return _decode(payload)
+
+    def _set(self, key: str, value: Any, fetched_at: float, ttl: float) -> None:
+        path = self._path(key, ".json")
+        # One temporary file per thread, since writes of a key may now overlap
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(f"{time.time() + ttl}\n".encode() + _encode(value, fetched_at))
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _lease_guard(self, key: str) -> Iterator[None]:
+        """Hold an exclusive lock on the key's guard file
+
+        Reading, taking over and releasing a lease happen under it, so two
+        workers cannot both replace an expired lease.
+        """
+        # POSIX only, like the multi-worker mode that uses this backend
+        import fcntl
+
+        with open(self._path(key, ".lease.lock"), "a") as guard:
+            fcntl.flock(guard, fcntl.LOCK_EX)
+            yield
+
+    def _lease_holder(self, path: Path) -> Tuple[Optional[str], float]:
+        """The token and expiry time in a lease file; (None, 0) when there is none"""
+        try:
+            token, expires = path.read_text().split()
+            return token, float(expires)
+        except (FileNotFoundError, ValueError):
+            return None, 0.0
+
+    def _acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        path = self._path(key, ".lease")
+        with self._lease_guard(key):
+            # A lease whose holder died without releasing it is taken over once expired
+            if self._lease_holder(path)[1] > time.time():
+                return None
+            token = secrets.token_hex(8)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(f"{token} {time.time() + ttl}")
+            os.replace(tmp, path)
+            return token
+
+    def _release_lease(self, key: str, token: str) -> None:
+        path = self._path(key, ".lease")
+        with self._lease_guard(key):
+            if self._lease_holder(path)[0] == token:
+                path.unlink(missing_ok=True)
+
+
+class RedisBackend(SharedBackend):
+    """Redis-compatible server; uses only PING, GET, SET NX PX and DEL"""
+
+    name = "redis"
+
+    def __init__(self, url: str = SHARED_CACHE_REDIS_URL):
+        import redis.asyncio as redis
+
+        self.url = url
+        # RESP2: spoken by every Redis-compatible server, including the benchmark stand-in
+        self._redis = redis.from_url(url, protocol=2)
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        return _decode(await self._redis.get(key))
+
+    async def set(self, key: str, value: Any, fetched_at: float, ttl: float) -> None:
+        await self._redis.set(key, _encode(value, fetched_at), px=max(1, int(ttl * 1000)))
+
+    async def acquire_lease(self, key: str, ttl: float = SHARED_CACHE_LEASE_TTL) -> Optional[str]:
+        token = secrets.token_hex(8)
+        acquired = await self._redis.set(f"lease:{key}", token, nx=True, px=max(1, int(ttl * 1000)))
+        return token if acquired else None
+
+    async def release_lease(self, key: str, token: str) -> None:
+        # GET then DEL rather than a script, so minimal RESP servers work too;
+        # at worst a lease that just expired and was retaken is dropped early
+        if await self._redis.get(f"lease:{key}") == token.encode():
+            await self._redis.delete(f"lease:{key}")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_backend(kind: str = SHARED_CACHE_BACKEND) -> Optional[SharedBackend]:
+    """Create the configured backend; None means in-process caching only"""
+    if kind == "redis":
+        try:
+            return RedisBackend()
+        except ImportError:
+            print("⚠️  SHARED_CACHE_BACKEND=redis needs redis-py (uv sync --extra redis); using the file backend.")
+            return FileBackend()
+    if kind == "file":
+        return FileBackend()
+    return None
+
+
+async def wait_for_shared(
+    backend: SharedBackend, key: str, newer_than: float, timeout: float, interval: float = 0.1
+) -> Optional[Tuple[Any, float]]:
+    """Poll until another worker publishes a value fetched after newer_than"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+        shared = await backend.get(key)
+        if shared is not None and shared[1] > newer_than:
+            return shared
+    return None
@@ -0,0 +1,246 @@
+"""Compact text rendering of tool results for the LLM
+
+Tool results are sent to the model as short text lines with rounded numbers.
+They keep only what the system prompt works with (feels-like temperature,
+humidity, wind, precipitation, UV and the time) and drop ids, notes,
+descriptions and empty fields. Cached weather values are the same objects
+until they are refreshed, so each one is rendered once and then served from
+a memo keyed by identity. TOOL_PAYLOAD_FORMAT=json sends the full results as
+JSON instead.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# compact or json (the full result, as before)
+TOOL_PAYLOAD_FORMAT = os.getenv("TOOL_PAYLOAD_FORMAT", "compact").lower()
+# Rendered results kept; one per cached weather value is enough
+TOOL_PAYLOAD_MEMO_SIZE = int(os.getenv("TOOL_PAYLOAD_MEMO_SIZE", "256"))
+
+# History columns sent, in this order
+HISTORY_COLUMNS = (
+    "temperature_c",
+    "feels_like_c",
+    "humidity",
+    "wind_kmh",
+    "gust_kmh",
+    "precip_rate_mm",
+)
+
+
+def _num(value: Any, decimals: int = 1) -> str:
+    """A number rounded to decimals, without a trailing .0; ? when missing"""
+    if value is None:
+        return "?"
+    if isinstance(value, (int, float)):
+        return f"{round(value, decimals):g}"
+    return str(value)
+
+
+def _stale_note(result: Dict[str, Any]) -> Optional[str]:
+    if result.get("stale"):
+        return f"(stale: {round(result.get('stale_age_seconds', 0) / 60)} min old)"
+    return None
+
+
+def _unavailable(result: Dict[str, Any]) -> Optional[str]:
+    """A one-line answer for results without data, else None"""
+    if result.get("unavailable"):
+        return "unavailable: " + (result.get("note") or "weather data is temporarily unavailable")
+    return None
+
+
+def _observed_utc(current: Dict[str, Any]) -> str:
+    """Observation time in UTC with a Z, like the history table, so the hour is not misread"""
+    epoch = current.get("observation_epoch")
+    if epoch is not None:
+        observed = datetime.fromtimestamp(epoch, timezone.utc)
+    else:
+        # Stored fallbacks only carry the server-local timestamp
+        try:
+            observed = datetime.fromisoformat(current["timestamp"]).astimezone(timezone.utc)
+        except (KeyError, TypeError, ValueError):
+            return "?"
+    return observed.strftime("%Y-%m-%d %H:%MZ")
+
+
+def render_current(current: Dict[str, Any]) -> str:
+    failed = _unavailable(current)
+    if failed:
+        return "now " + failed
+    parts = [
+        f"now {_observed_utc(current)}:",
+        f"temp {_num(current.get('temperature_c'))}C,",
+        f"feels {_num(current.get('feels_like_c'))}C,",
+        f"humidity {_num(current.get('humidity'), 0)}%,",
+        f"wind {_num(current.get('wind_kmh'), 0)} km/h,",
+        f"uv {_num(current.get('uv_index'), 0)}",
+    ]
+    stale = _stale_note(current)
+    if stale:
+        parts.append(stale)
+    return " ".join(parts)
+
+
+def _forecast_line(label: str, day: Dict[str, Any]) -> str:
+    line = (
+        f"{label} {(day.get('day_of_week') or '')[:3]} {(day.get('date') or '')[5:]}: "
+        f"{_num(day.get('high_c'), 0)}/{_num(day.get('low_c'), 0)}C, "
+        f"rain {_num(day.get('precipitation_chance'), 0)}%, wind {_num(day.get('wind_kmh'), 0)}"
+    )
+    if day.get("conditions"):
+        line += f" - {day['conditions']}"
+    return line
+
+
+def render_forecast(forecast: Dict[str, Any]) -> str:
+    failed = _unavailable(forecast)
+    if failed:
+        return "forecast " + failed
+    lines = ["forecast (high/low C, rain chance, wind km/h)"]
+    if forecast.get("stale"):
+        lines[0] += " " + _stale_note(forecast)
+    lines.append(_forecast_line("today", forecast["today"]))
+    lines.append(_forecast_line("tomorrow", forecast["tomorrow"]))
+    lines.extend(_forecast_line("", day).lstrip() for day in forecast.get("extended") or [])
+    return "\n".join(lines)
+
+
+def render_all(data: Dict[str, Any]) -> str:
+    lines = []
+    if data.get("location"):
+        lines.append(f"location {data['location']}")
+    lines.append(memo.get(data["current"], render_current))
+    lines.append(memo.get(data["forecast"], render_forecast))
+    return "\n".join(lines)
+
+
+def _daypart_line(label: str, part: Optional[Dict[str, Any]]) -> str:
+    if not part:
+        return f"  {label}: past"
+    text = (
+        f"  {label}: {part.get('conditions') or '?'}, {_num(part.get('temperature_c'), 0)}C, "
+        f"rain {_num(part.get('precipitation_chance'), 0)}% {_num(part.get('precipitation_mm'))}mm, "
+        f"humidity {_num(part.get('humidity'), 0)}%, wind {_num(part.get('wind_kmh'), 0)} km/h"
+    )
+    if part.get("wind_direction"):
+        text += f" {part['wind_direction']}"
+    if part.get("uv_index"):
+        text += f", uv {part['uv_index']}"
+    return text
+
+
+def render_forecast_days(result: Dict[str, Any]) -> str:
+    failed = _unavailable(result)
+    if failed:
+        return "forecast " + failed
+    lines = [f"forecast days {result['start_day']}.. of {result['available_days']} (0 = today)"]
+    if result.get("stale"):
+        lines[0] += " " + _stale_note(result)
+    for day in result["days"]:
+        lines.append(
+            f"{(day.get('day_of_week') or '')[:3]} {day.get('date')}: "
+            f"{_num(day.get('high_c'), 0)}/{_num(day.get('low_c'), 0)}C, rain {_num(day.get('precipitation_mm'))}mm, "
+            f"sun {day.get('sunrise') or '?'}-{day.get('sunset') or '?'} - {day.get('narrative') or ''}".rstrip(" -")
+        )
+        for label in ("day", "night"):
+            if label in day:
+                lines.append(_daypart_line(label, day[label]))
+    return "\n".join(lines)
+
+
+def render_history(history: Dict[str, Any]) -> str:
+    """A table with one row per bucket (or observation)"""
+    bucketed = history.get("bucket_seconds", 0) > 0
+    stat = "_avg" if bucketed else ""
+    columns = [name for name in HISTORY_COLUMNS if name + stat in history]
+    header = "time(UTC) " + " ".join(columns) + (" temp_min temp_max" if bucketed else "")
+    rows = [f"history {history.get('count', 0)} rows, bucket {history.get('bucket_seconds')}s", header]
+    for i, time in enumerate(history.get("time") or []):
+        cells = [time[5:16].replace("T", " ")]
+        cells.extend(_num(history[name + stat][i], 0 if name == "humidity" else 1) for name in columns)
+        if bucketed:
+            cells.append(_num(history["temperature_c_min"][i]))
+            cells.append(_num(history["temperature_c_max"][i]))
+        rows.append(" ".join(cells))
+    return "\n".join(rows)
+
+
+def _compact_json(result: Any) -> str:
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "get_current_weather": render_current,
+    "get_weather_forecast": render_forecast,
+    "get_all_weather": render_all,
+    "get_forecast_days": render_forecast_days,
+    "get_weather_history": render_history,
+}
+
+
+class RenderMemo:
+    """Rendered text per result object, least recently used evicted first
+
+    Keyed by id() and renderer; the object is kept alongside its text so the
+    id cannot be reused while the entry exists. Results must not be mutated after rendering.
+    """
+
+    def __init__(self, size: int = TOOL_PAYLOAD_MEMO_SIZE):
+        self.size = max(size, 1)
+        self._entries: "OrderedDict[Tuple[int, Callable], Tuple[Any, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, value: Any, render: Callable[[Any], str]) -> str:
+        key = (id(value), render)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is value:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        text = render(value)
+        self._entries[key] = (value, text)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+memo = RenderMemo()
+
+
+def is_tool_error(result: Any) -> bool:
+    """True for failed calls (unknown tool or station, bad argument, exception, timeout)
+
+    Stale and unavailable fallbacks also carry an error, but are usable answers.
+    """
+    return (
+        isinstance(result, dict)
+        and "error" in result
+        and not result.get("stale")
+        and not result.get("unavailable")
+    )
+
+
+def render_tool_result(tool_name: str, result: Any, payload_format: Optional[str] = None) -> str:
+    """The tool message content sent to the model for a tool result"""
+    if (payload_format or TOOL_PAYLOAD_FORMAT) == "json":
+        return json.dumps(result)
+    render = RENDERERS.get(tool_name)
+    if render is None or not isinstance(result, dict):
+        return memo.get(result, _compact_json)
+    if is_tool_error(result):
+        return "error: " + str(result["error"])
+    try:
+        return memo.get(result, render)
+    except (KeyError, TypeError, ValueError):
+        # A result in an unexpected shape is still sent, as compact JSON
+        return memo.get(result, _compact_json)
+
@@ -0,0 +1,185 @@
+"""Vectorized unit conversion and derived metrics for Weather Underground observations
+
+convert_observations turns a whole observation series into NumPy columns in
+metric units in one pass, and derives dew point, heat index, wind chill and
+the apparent ("feels like") temperature. convert_observations_scalar is the
+per-observation reference implementation of the same formulas.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MPH_TO_KMH = 1.60934
+INHG_TO_HPA = 33.8639
+IN_TO_MM = 25.4
+
+# Wind chill applies at or below 10 °C with wind above 4.8 km/h,
+# the heat index at or above 26.7 °C (80 °F)
+WIND_CHILL_MAX_C = 10.0
+WIND_CHILL_MIN_KMH = 4.8
+HEAT_INDEX_MIN_C = 26.7
+
+# Magnus formula coefficients for dew point over water
+_MAGNUS_A = 17.625
+_MAGNUS_B = 243.04
+
+
+def f_to_c(f: np.ndarray) -> np.ndarray:
+    return (f - 32.0) * (5.0 / 9.0)
+
+
+def c_to_f(c: np.ndarray) -> np.ndarray:
+    return c * (9.0 / 5.0) + 32.0
+
+
+def dew_point_c(temp_c: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """Dew point from temperature and relative humidity (Magnus formula)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = np.log(humidity / 100.0) + _MAGNUS_A * temp_c / (_MAGNUS_B + temp_c)
+        return _MAGNUS_B * gamma / (_MAGNUS_A - gamma)
+
+
+def heat_index_c(temp_c: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """NWS heat index: Steadman's simple formula, Rothfusz regression above 80 °F"""
+    t = c_to_f(temp_c)
+    rh = humidity
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    full = (
+        -42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+        - 0.00683783 * t * t - 0.05481717 * rh * rh + 0.00122874 * t * t * rh
+        + 0.00085282 * t * rh * rh - 0.00000199 * t * t * rh * rh
+    )
+    dry = (rh < 13) & (t >= 80) & (t <= 112)
+    full = full - np.where(dry, (13 - rh) / 4 * np.sqrt(np.clip(17 - np.abs(t - 95), 0, None) / 17), 0.0)
+    humid = (rh > 85) & (t >= 80) & (t <= 87)
+    full = full + np.where(humid, (rh - 85) / 10 * (87 - t) / 5, 0.0)
+    return f_to_c(np.where((simple + t) / 2 >= 80, full, simple))
+
+
+def wind_chill_c(temp_c: np.ndarray, wind_kmh: np.ndarray) -> np.ndarray:
+    """North American wind chill index (metric form)"""
+    v = np.power(np.clip(wind_kmh, 0, None), 0.16)
+    return 13.12 + 0.6215 * temp_c - 11.37 * v + 0.3965 * temp_c * v
+
+
+def apparent_temperature_c(
+    temp_c: np.ndarray, humidity: np.ndarray, wind_kmh: np.ndarray
+) -> np.ndarray:
+    """Wind chill when cold and windy, heat index when hot, else the air temperature"""
+    with np.errstate(invalid="ignore"):
+        cold = (temp_c <= WIND_CHILL_MAX_C) & (wind_kmh > WIND_CHILL_MIN_KMH)
+        hot = temp_c >= HEAT_INDEX_MIN_C
+    return np.where(cold, wind_chill_c(temp_c, wind_kmh), np.where(hot, heat_index_c(temp_c, humidity), temp_c))
+
+
+def _column(observations: Sequence[Dict[str, Any]], key: str, imperial: bool = True) -> np.ndarray:
+    if imperial:
+        values = [(obs.get("imperial") or {}).get(key) for obs in observations]
+    else:
+        values = [obs.get(key) for obs in observations]
+    # None becomes NaN
+    return np.array(values, dtype=np.float64)
+
+
+def convert_observations(observations: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convert a series of observations to metric columns plus derived metrics"""
+    temp_c = f_to_c(_column(observations, "tempAvg"))
+    humidity = _column(observations, "humidityAvg", imperial=False)
+    wind_kmh = _column(observations, "windspeedAvg") * MPH_TO_KMH
+    return {
+        "epoch": _column(observations, "epoch", imperial=False),
+        "temperature_c": temp_c,
+        "dew_point_c": dew_point_c(temp_c, humidity),
+        "heat_index_c": heat_index_c(temp_c, humidity),
+        "wind_chill_c": wind_chill_c(temp_c, wind_kmh),
+        "feels_like_c": apparent_temperature_c(temp_c, humidity, wind_kmh),
+        "humidity": humidity,
+        "wind_kmh": wind_kmh,
+        "gust_kmh": _column(observations, "windgustHigh") * MPH_TO_KMH,
+        "pressure_mb": _column(observations, "pressureMax") * INHG_TO_HPA,
+        "precip_rate_mm": _column(observations, "precipRate") * IN_TO_MM,
+        "uv_index": _column(observations, "uvHigh", imperial=False),
+    }
+
+
+def to_list(values: np.ndarray, decimals: int = 1) -> List[Optional[float]]:
+    """Round a column and turn NaN into None for JSON and SQLite"""
+    rounded = np.round(values, decimals)
+    return [None if math.isnan(v) else v for v in rounded.tolist()]
+
+
+def to_value(value: float, decimals: int = 1) -> Optional[float]:
+    """Round one element and turn NaN into None; decimals=0 gives an int"""
+    if math.isnan(value):
+        return None
+    return round(float(value), decimals) if decimals else int(round(float(value)))
+
+
+def _scalar_dew_point(t: float, rh: float) -> float:
+    if rh <= 0:
+        return math.nan
+    gamma = math.log(rh / 100.0) + _MAGNUS_A * t / (_MAGNUS_B + t)
+    return _MAGNUS_B * gamma / (_MAGNUS_A - gamma)
+
+
+def _scalar_heat_index(temp_c: float, rh: float) -> float:
+    t = temp_c * 9 / 5 + 32
+    hi = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    if (hi + t) / 2 >= 80:
+        hi = (
+            -42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+            - 0.00683783 * t * t - 0.05481717 * rh * rh + 0.00122874 * t * t * rh
+            + 0.00085282 * t * rh * rh - 0.00000199 * t * t * rh * rh
+        )
+        if rh < 13 and 80 <= t <= 112:
+            hi -= (13 - rh) / 4 * math.sqrt((17 - abs(t - 95)) / 17)
+        elif rh > 85 and 80 <= t <= 87:
+            hi += (rh - 85) / 10 * (87 - t) / 5
+    return (hi - 32) * 5 / 9
+
+
+def _scalar_wind_chill(t: float, wind_kmh: float) -> float:
+    v = max(wind_kmh, 0.0) ** 0.16
+    return 13.12 + 0.6215 * t - 11.37 * v + 0.3965 * t * v
+
+
+def convert_observations_scalar(observations: Sequence[Dict[str, Any]]) -> List[Dict[str, Optional[float]]]:
+    """Reference implementation: the same conversions, one observation at a time"""
+
+    def num(value: Any) -> float:
+        return math.nan if value is None else float(value)
+
+    rows = []
+    for obs in observations:
+        imperial = obs.get("imperial") or {}
+        t = (num(imperial.get("tempAvg")) - 32) * 5 / 9
+        rh = num(obs.get("humidityAvg"))
+        wind = num(imperial.get("windspeedAvg")) * MPH_TO_KMH
+        has_t_rh = not (math.isnan(t) or math.isnan(rh))
+        heat_index = _scalar_heat_index(t, rh) if has_t_rh else math.nan
+        wind_chill = _scalar_wind_chill(t, wind) if not (math.isnan(t) or math.isnan(wind)) else math.nan
+        if t <= WIND_CHILL_MAX_C and wind > WIND_CHILL_MIN_KMH:
+            feels_like = wind_chill
+        elif t >= HEAT_INDEX_MIN_C:
+            feels_like = heat_index
+        else:
+            feels_like = t
+        rows.append(
+            {
+                "epoch": num(obs.get("epoch")),
+                "temperature_c": t,
+                "dew_point_c": _scalar_dew_point(t, rh) if has_t_rh else math.nan,
+                "heat_index_c": heat_index,
+                "wind_chill_c": wind_chill,
+                "feels_like_c": feels_like,
+                "humidity": rh,
+                "wind_kmh": wind,
+                "gust_kmh": num(imperial.get("windgustHigh")) * MPH_TO_KMH,
+                "pressure_mb": num(imperial.get("pressureMax")) * INHG_TO_HPA,
+                "precip_rate_mm": num(imperial.get("precipRate")) * IN_TO_MM,
+                "uv_index": num(obs.get("uvHigh")),
+            }
+        )
+    return rows
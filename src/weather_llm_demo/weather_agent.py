@@ -1,163 +1,474 @@
 import httpx
+import asyncio
+import hashlib
 import httpx
-import json
+import inspect
 import os
-from bs4 import BeautifulSoup
-from typing import Dict, Any
-from datetime import datetime
-from dotenv import load_dotenv
+import time
+from typing import Dict, Any, Awaitable, Callable, Hashable, Optional, Tuple, Union
+from datetime import datetime, timezone
+from .http_client import create_http_client
+from .app_state import locate_state_script, section_from_script
+from .forecast import DAYPARTS, Forecast, parse_forecast
+from .metrics import FALLBACKS, SCRAPES, timed
+from .observation_store import ObservationStore, observation_store
+from .resilience import Upstream, weather_upstream
+from .shared_cache import SHARED_CACHE_LEASE_TTL, SHARED_CACHE_RECHECK, SharedBackend, create_backend, wait_for_shared
 
-load_dotenv()
+# Cache TTLs per data kind, in seconds. Stations report roughly every 5 minutes
+# and the forecast is refreshed far less often.
+CURRENT_TTL = float(os.getenv("WEATHER_CURRENT_TTL", "300"))
+FORECAST_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "1800"))
+# How long past its TTL an entry may still be served while it is refreshed.
+STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", "3600"))
+# Weather Underground origin; point it at a local stand-in for offline load tests.
+WU_BASE_URL = os.getenv("WU_BASE_URL", "https://www.wunderground.com").rstrip("/")
+# Forecast page for a station; Weather Underground resolves it by the station id.
+FORECAST_URL_TEMPLATE = os.getenv(
+    "FORECAST_URL_TEMPLATE", WU_BASE_URL + "/weather/it/rome/{station_id}"
+)
+# Upper bound on how long a caller waits for a scrape before using fallback data.
+SCRAPE_TIMEOUT = float(os.getenv("WEATHER_SCRAPE_TIMEOUT", "15"))
+
+
+class _CacheEntry:
+    __slots__ = ("value", "fetched_at", "recheck_at")
+
+    def __init__(self, value: Any, fetched_at: float, recheck_at: float = 0.0):
+        self.value = value
+        self.fetched_at = fetched_at
+        # A stale entry is not reloaded before this monotonic time
+        self.recheck_at = recheck_at
+
+
+class _PageState:
+    """Validators and the last derived result of one scraped page"""
+
+    __slots__ = ("etag", "last_modified", "content_hash", "result")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], content_hash: bytes, result: Dict[str, Any]):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.result = result
+
+
+class WeatherCache:
+    """TTL cache with single-flight loading and stale-while-revalidate"""
+
+    def __init__(self, stale_ttl: float = STALE_TTL, shared: Optional[SharedBackend] = None):
+        self.stale_ttl = stale_ttl
+        # Cross-process layer consulted on local misses, see shared_cache
+        self.shared = shared
+        self._entries: Dict[Hashable, _CacheEntry] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.shared_hits = 0
+
+    async def get(
+        self, key: Hashable, ttl: float, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value for key, loading it through loader when needed"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < ttl:
+                self.hits += 1
+                return entry.value
+            if age < ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._inflight and time.monotonic() >= entry.recheck_at:
+                    self._start_load(key, ttl, loader)
+                return entry.value
+
+        self.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+        return await asyncio.shield(self._start_load(key, ttl, loader))
+
+    def _start_load(
+        self, key: Hashable, ttl: float, loader: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Future:
+        """Start a single shared load for key"""
+        task = asyncio.ensure_future(self._load(key, ttl, loader))
+        task.add_done_callback(_consume_exception)
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, ttl: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            if self.shared is None:
+                value, fetched_at = await loader(), time.time()
+            else:
+                value, fetched_at = await self._load_shared(key, ttl, loader)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.refreshes += 1
+        # Entries read from the shared layer keep the age they already have
+        age = max(0.0, time.time() - fetched_at)
+        now = time.monotonic()
+        # A stale copy served while another worker refreshes is kept for a short
+        # while, instead of asking the shared cache again on every lookup
+        recheck_at = now + SHARED_CACHE_RECHECK if age >= ttl else 0.0
+        self._entries[key] = _CacheEntry(value, now - age, recheck_at)
+        return value
+
+    async def _load_shared(
+        self, key: Hashable, ttl: float, loader: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, float]:
+        """Read the shared snapshot, or refresh it if this process gets the lease"""
+        shared_key = "weather:" + (":".join(map(str, key)) if isinstance(key, tuple) else str(key))
+        try:
+            shared = await self.shared.get(shared_key)
+            if shared is not None and time.time() - shared[1] < ttl:
+                self.shared_hits += 1
+                return shared
+            token = await self.shared.acquire_lease(shared_key)
+        except Exception as e:
+            print(f"⚠️  Shared cache unavailable, fetching locally: {e}")
+            return await loader(), time.time()
+
+        if token is None:
+            # Another worker is refreshing: serve its stale copy or wait for the new one
+            if shared is not None and time.time() - shared[1] < ttl + self.stale_ttl:
+                self.shared_hits += 1
+                return shared
+            fresh = await wait_for_shared(
+                self.shared, shared_key, shared[1] if shared else 0.0, SHARED_CACHE_LEASE_TTL
+            )
+            if fresh is not None:
+                self.shared_hits += 1
+                return fresh
+
+        try:
+            value = await loader()
+            fetched_at = time.time()
+            try:
+                await self.shared.set(shared_key, value, fetched_at, ttl + self.stale_ttl)
+            except Exception as e:
+                print(f"⚠️  Could not publish {shared_key} to the shared cache: {e}")
+            return value, fetched_at
+        finally:
+            if token is not None:
+                try:
+                    await self.shared.release_lease(shared_key, token)
+                except Exception:
+                    pass
+
+    def last_known(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Return the last successfully loaded value for key and its age, however old"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.value, time.monotonic() - entry.fetched_at
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or every entry when key is None"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the age of every cached entry"""
+        now = time.monotonic()
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "shared_backend": self.shared.name if self.shared is not None else None,
+            "shared_hits": self.shared_hits,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            "inflight": len(self._inflight),
+            "entries": {
+                ":".join(map(str, key)) if isinstance(key, tuple) else str(key): {
+                    "age_seconds": round(now - entry.fetched_at, 1)
+                }
+                for key, entry in self._entries.items()
+            },
+        }
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    """Mark a load failure as retrieved even if every waiter has given up on it"""
+    if not task.cancelled():
+        task.exception()
+
+
+# Shared by every WeatherAgent in the process, and across workers through the shared backend
+weather_cache = WeatherCache(shared=create_backend())
 
 
 class WeatherAgent:
     """Weather agent that scrapes Weather Underground data"""
 
-    def __init__(self):
-        station_id = os.getenv("STATION_ID")
+    def __init__(
+        self,
+        station_id: Optional[str] = None,
+        location: Optional[str] = None,
+        cache: Optional[WeatherCache] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        store: Optional[ObservationStore] = None,
+        upstream: Optional[Upstream] = None,
+    ):
+        if station_id is None:
+            station_id = os.getenv("STATION_ID")
+            location = location or os.getenv("LOCATION")
         if not station_id:
             raise ValueError("STATION_ID not set in environment variables")
-        self.station_url = f"https://www.wunderground.com/dashboard/pws/{station_id}"
-        self.forecast_url = f"https://www.wunderground.com/weather/it/rome/{station_id}"
+        self.station_id = station_id
+        self.location = location
+        self.cache = cache if cache is not None else weather_cache
+        self.client = client
+        self.store = store if store is not None else observation_store
+        self.upstream = upstream if upstream is not None else weather_upstream
+        self.station_url = f"{WU_BASE_URL}/dashboard/pws/{station_id}"
+        # Per page URL: ETag/Last-Modified and state blob hash of the last scrape
+        self._pages: Dict[str, _PageState] = {}
+        # Parsed forecast columns and their summary, rebuilt only when the cached columns change
+        self._forecast_summary: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+        self.forecast_url = FORECAST_URL_TEMPLATE.format(station_id=station_id)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating a private pooled one if none was attached"""
+        if self.client is None or self.client.is_closed:
+            self.client = create_http_client("WEATHER_HTTP")
+        return self.client
+
+    async def aclose(self) -> None:
+        """Close the HTTP client used by this agent"""
+        if self.client is not None:
+            await self.client.aclose()
+
     async def get_current_conditions(self) -> Dict[str, Any]:
-        """Fetch and parse current weather conditions from Weather Underground"""
+        """Get current weather conditions, served from the shared cache"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.station_url, headers=self.headers)
+            return await asyncio.wait_for(
+                self.cache.get(("current", self.station_id), CURRENT_TTL, self._fetch_current_conditions),
+                SCRAPE_TIMEOUT,
+            )
+        except Exception as e:
+            return self._degraded("current", e)
+
+    def _degraded(
+        self, kind: str, error: Exception, render: Optional[Callable[[Any], Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Serve the last known-good data, marked stale, instead of making some up
+
+        render turns a cached value into the response, for kinds cached in
+        another form. For current conditions the latest stored observation is
+        used when the cache is empty, e.g. right after a restart.
+        """
+        reason = str(error) or type(error).__name__
+        last = self.cache.last_known((kind, self.station_id))
+        if last is not None:
+            FALLBACKS.inc(component="weather_agent", reason=f"{kind}_stale")
+            value, age = last
+            if render is not None:
+                value = render(value)
+            return {**value, "stale": True, "stale_age_seconds": round(age), "error": reason}
+
+        if kind == "current":
+            latest = self.store.latest(self.station_id)
+            if latest is not None:
+                FALLBACKS.inc(component="weather_agent", reason="current_stored")
+                return {
+                    **{name: latest[name] for name in ("temperature_c", "humidity", "wind_kmh", "pressure_mb", "feels_like_c", "dew_point_c", "uv_index")},
+                    "description": "Last stored observation",
+                    "timestamp": datetime.fromtimestamp(latest["epoch"]).isoformat(),
+                    "station": self.station_id,
+                    "stale": True,
+                    "stale_age_seconds": round(time.time() - latest["epoch"]),
+                    "error": reason,
+                }
+
+        FALLBACKS.inc(component="weather_agent", reason=f"{kind}_unavailable")
+        return {
+            "error": reason,
+            "unavailable": True,
+            "note": "Weather data is temporarily unavailable",
+            "station": self.station_id,
+        }
+
+    async def _fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a page through the upstream's retry policy and circuit breaker
+
+        A 304 Not Modified is returned like a success.
+        """
+        request_headers = {**self.headers, **headers} if headers else self.headers
+
+        async def fetch() -> httpx.Response:
+            response = await self._get_client().get(url, headers=request_headers)
+            if response.status_code != 304:
                 response.raise_for_status()
+            return response
+
+        # upstream_fetch times each attempt; upstream_call includes retries and backoff
+        with timed("upstream_call", url=url):
+            return await self.upstream.call(fetch, stage="upstream_fetch", url=url)
+
+    async def _scrape(
+        self,
+        url: str,
+        page: str,
+        key: str,
+        derive: Callable[[Dict[str, Any]], Union[Dict[str, Any], Awaitable[Dict[str, Any]]]],
+    ) -> Dict[str, Any]:
+        """Fetch a page and derive a result from its state section
+
+        The previous ETag/Last-Modified are sent as a conditional GET. On a 304,
+        or when the app-root-state blob hashes the same as last time, the last
+        result is returned without decoding or deriving anything.
+        """
+        previous = self._pages.get(url)
+        conditional: Dict[str, str] = {}
+        if previous is not None:
+            if previous.etag:
+                conditional["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                conditional["If-Modified-Since"] = previous.last_modified
 
-            soup = BeautifulSoup(response.text, "lxml")
-            script = soup.find("script", {"id": "app-root-state"})
-            if not script:
-                raise ValueError("Could not find app-root-state script tag")
-            
-            script_content = script.get_text()
-            if not script_content:
-                raise ValueError("Script tag is empty")
-
-            data = json.loads(script_content)
-            
-            latest_obs = None
-            for key in data:
-                if isinstance(data[key], dict) and "b" in data[key] and isinstance(data[key]["b"], dict) and "observations" in data[key]["b"]:
-                    if data[key]["b"]["observations"]:
-                        latest_obs = data[key]["b"]["observations"][-1]
-                        break
-            
-            if not latest_obs:
-                raise ValueError("Could not find observations data in JSON")
-
-            imperial = latest_obs.get("imperial", {})
-            
-            def f_to_c(f):
-                return round((f - 32) * 5 / 9, 1) if f is not None else None
-
-            conditions = {
-                "temperature_c": f_to_c(imperial.get("tempAvg")),
-                "humidity": latest_obs.get("humidityAvg"),
-                "wind_kmh": imperial.get("windspeedAvg"),
-                "pressure_mb": imperial.get("pressureMax"),
-                "feels_like_c": f_to_c(imperial.get("heatindexAvg")),
-                "uv_index": latest_obs.get("uvHigh"),
-                "description": "Scraped from Weather Underground JSON",
-                "timestamp": datetime.now().isoformat(),
-                "station": os.getenv("STATION_ID"),
-            }
-            
-            if conditions["wind_kmh"] is not None:
-                conditions["wind_kmh"] = round(conditions["wind_kmh"] * 1.60934, 1)
-            if conditions["pressure_mb"] is not None:
-                conditions["pressure_mb"] = round(conditions["pressure_mb"] * 33.8639, 1)
-
-            return conditions
+        response = await self._fetch_page(url, conditional)
+        if response.status_code == 304:
+            if previous is None:
+                raise ValueError(f"Unexpected 304 Not Modified for {url}")
+            SCRAPES.inc(page=page, result="not_modified")
+            return previous.result
+
+        script = locate_state_script(response.content)
+        content_hash = hashlib.blake2b(script, digest_size=16).digest()
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if previous is not None and previous.content_hash == content_hash:
+            SCRAPES.inc(page=page, result="unchanged")
+            previous.etag, previous.last_modified = etag, last_modified
+            return previous.result
+
+        result = derive(section_from_script(script, key))
+        if inspect.isawaitable(result):
+            result = await result
+        self._pages[url] = _PageState(etag, last_modified, content_hash, result)
+        SCRAPES.inc(page=page, result="changed")
+        return result
+
+    async def _fetch_current_conditions(self) -> Dict[str, Any]:
+        """Fetch and parse current weather conditions from Weather Underground"""
+        return await self._scrape(self.station_url, "current", "observations", self._derive_current_conditions)
 
+    async def _derive_current_conditions(self, section: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the day's observations and build the current conditions from the latest"""
+        # NumPy is imported on the first scrape rather than at startup
+        from .units import convert_observations, to_value
+
+        observations = section["observations"]
+        # Convert the whole day's series at once; the latest reading is its last row
+        series = convert_observations(observations)
+        try:
+            # SQLite writes and commits in a worker thread, off the event loop
+            await asyncio.to_thread(self.store.add_series, self.station_id, series)
         except Exception as e:
-            return {
-                "error": str(e),
-                "note": "Using fallback demo data due to scraping error",
-                "temperature_c": 24.5,
-                "humidity": 65,
-                "wind_kmh": 12.0,
-                "description": "Partly Cloudy (fallback)",
-                "pressure_mb": 1015,
-                "feels_like_c": 25.0,
-                "uv_index": 4,
-                "timestamp": datetime.now().isoformat(),
-                "station": os.getenv("STATION_ID"),
-            }
+            print(f"⚠️  Could not store observations for {self.station_id}: {e}")
+
+        observation_epoch = to_value(series["epoch"][-1], 0)
+        conditions = {
+            "temperature_c": to_value(series["temperature_c"][-1]),
+            "humidity": to_value(series["humidity"][-1], 0),
+            "wind_kmh": to_value(series["wind_kmh"][-1]),
+            "pressure_mb": to_value(series["pressure_mb"][-1]),
+            "feels_like_c": to_value(series["feels_like_c"][-1]),
+            "dew_point_c": to_value(series["dew_point_c"][-1]),
+            "uv_index": to_value(series["uv_index"][-1]),
+            "description": "Scraped from Weather Underground JSON",
+            "timestamp": datetime.now().isoformat(),
+            "observation_epoch": observation_epoch,
+            "observed_at": (
+                datetime.fromtimestamp(observation_epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                if observation_epoch is not None
+                else None
+            ),
+            "station": self.station_id,
+        }
+
+        return conditions
+
+    async def get_history(
+        self,
+        hours: float = 24,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        bucket: int = 3600,
+    ) -> Dict[str, Any]:
+        """Get stored observations for a time range, downsampled to buckets of seconds
+
+        The current conditions are requested first so today's series is stored.
+        """
+        await self.get_current_conditions()
+        end = int(end if end is not None else time.time())
+        start = int(start if start is not None else end - hours * 3600)
+        return self.store.history(self.station_id, start, end, bucket)
 
     async def get_forecast(self) -> Dict[str, Any]:
-        """Fetch and parse weather forecast from Weather Underground"""
+        """Get today's, tomorrow's and the following days' forecast, served from the shared cache"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.forecast_url, headers=self.headers)
-                response.raise_for_status()
+            columns = await self._forecast_columns()
+            if self._forecast_summary is None or self._forecast_summary[0] is not columns:
+                self._forecast_summary = (columns, Forecast(columns).summary())
+            return self._forecast_summary[1]
+        except Exception as e:
+            return self._degraded("forecast", e, lambda columns: Forecast(columns).summary())
+
+    async def get_forecast_range(self, start_day: int = 0, days: int = 3, daypart: str = "both") -> Dict[str, Any]:
+        """Get detailed forecast days with their day and night parts, from the same cached parse
+
+        Raises ValueError for an unknown daypart.
+        """
+        if daypart not in DAYPARTS:
+            raise ValueError(f"daypart must be one of {', '.join(DAYPARTS)}")
 
-            soup = BeautifulSoup(response.text, "lxml")
-            script = soup.find("script", {"id": "app-root-state"})
-            if not script:
-                raise ValueError("Could not find app-root-state script tag")
-
-            script_content = script.get_text()
-            if not script_content:
-                raise ValueError("Script tag is empty")
-
-            data = json.loads(script_content)
-
-            forecast_data = None
-            for key in data:
-                if isinstance(data[key], dict) and "b" in data[key] and isinstance(data[key]["b"], dict) and "daypart" in data[key]["b"]:
-                    forecast_data = data[key]["b"]
-                    break
-            
-            if not forecast_data:
-                raise ValueError("Could not find forecast data in JSON")
-
-            def f_to_c(f):
-                return round((f - 32) * 5 / 9, 1) if f is not None else None
-
-            today_forecast = {
-                "high_c": f_to_c(forecast_data["calendarDayTemperatureMax"][0]),
-                "low_c": f_to_c(forecast_data["calendarDayTemperatureMin"][0]),
-                "conditions": forecast_data["narrative"][0],
-                "precipitation_chance": forecast_data["daypart"][0]["precipChance"][1],
-                "wind_kmh": round(forecast_data["daypart"][0].get("windSpeed", [])[1] * 1.60934, 1),
-            }
-            
-            tomorrow_forecast = {
-                "high_c": f_to_c(forecast_data["calendarDayTemperatureMax"][1]),
-                "low_c": f_to_c(forecast_data["calendarDayTemperatureMin"][1]),
-                "conditions": forecast_data["narrative"][1],
-                "precipitation_chance": forecast_data["daypart"][0]["precipChance"][2],
-                "wind_kmh": round(forecast_data["daypart"][0].get("windSpeed", [])[2] * 1.60934, 1),
-            }
-
-            return {
-                "today": today_forecast,
-                "tomorrow": tomorrow_forecast,
-                "extended": []
-            }
+        def select(columns: Dict[str, Any]) -> Dict[str, Any]:
+            return {**Forecast(columns).select(start_day, days, daypart), "station": self.station_id}
 
+        try:
+            return select(await self._forecast_columns())
         except Exception as e:
-            return {
-                "error": str(e),
-                "note": "Using fallback demo data due to scraping error",
-                "today": {"high_c": 28, "low_c": 18, "conditions": "Partly Cloudy (fallback)"},
-                "tomorrow": {"high_c": 30, "low_c": 19, "conditions": "Sunny (fallback)"},
-            }
+            return self._degraded("forecast", e, select)
+
+    async def _forecast_columns(self) -> Dict[str, Any]:
+        """The whole parsed forecast range, as cached"""
+        return await asyncio.wait_for(
+            self.cache.get(("forecast", self.station_id), FORECAST_TTL, self._fetch_forecast),
+            SCRAPE_TIMEOUT,
+        )
+
+    async def _fetch_forecast(self) -> Dict[str, Any]:
+        """Fetch and parse weather forecast from Weather Underground"""
+        return await self._scrape(self.forecast_url, "forecast", "daypart", parse_forecast)
 
     async def get_all_weather_data(self) -> Dict[str, Any]:
-        """Get both current conditions and forecast"""
-        current = await self.get_current_conditions()
-        forecast = await self.get_forecast()
+        """Get both current conditions and forecast, fetched concurrently"""
+        current, forecast = await asyncio.gather(
+            self.get_current_conditions(), self.get_forecast()
+        )
 
         return {
             "current": current,
             "forecast": forecast,
-            "location": os.getenv("LOCATION"),
-            "station_id": os.getenv("STATION_ID"),
+            "location": self.location,
+            "station_id": self.station_id,
         }